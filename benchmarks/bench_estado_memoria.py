@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from estado import JanelaEnvio, SessaoServidor
+
+# =================================================================
+# BENCHMARK: memória do estado por sessão e por pacote em trânsito
+# =================================================================
+# Compara o layout antigo (dict de 14 chaves com buffers dict por
+# sequência no servidor; dict de dicts por pacote no cliente) com as
+# classes de estado.py, para N sessões simultâneas com uma mensagem
+# de `pacotes` pacotes em andamento (metade já recebida/enviada).
+# Uso: python benchmarks/bench_estado_memoria.py --sessoes 10000
+# =================================================================
+
+CHUNKS = ['abcd'] * 8
+
+
+def sessao_dict(i, pacotes):
+    sessao = {
+        'session_id': f"{i:08x}", 'handshake_complete': True, 'buffer': {}, 'buffer_sr': {},
+        'packets_received': 0, 'acks_sent': 0, 'messages_complete': 0, 'start_time': time.time(),
+        'protocol': 'sr', 'corrupted': False, 'expected_seq_num': 0, 'total_packets_msg': pacotes,
+        'window_size': 5, 'max_payload': 4,
+    }
+    for seq in range(pacotes // 2):
+        sessao['buffer_sr'][seq] = CHUNKS[seq]
+    return sessao
+
+
+def sessao_slots(i, pacotes):
+    sessao = SessaoServidor(f"{i:08x}", 'sr', 5, 4, pacotes, handshake_complete=True)
+    sessao.total_packets_msg = pacotes
+    for seq in range(pacotes // 2):
+        sessao.armazenar(seq, CHUNKS[seq])
+    return sessao
+
+
+def janela_dict(i, pacotes):
+    estados = {seq: {'sent': False, 'ack': False, 'data': CHUNKS[seq], 'timer': -1} for seq in range(pacotes)}
+    for seq in range(pacotes // 2):
+        estados[seq]['sent'] = True
+        estados[seq]['timer'] = time.time()
+    return estados
+
+
+def janela_slots(i, pacotes):
+    janela = JanelaEnvio(5)
+    janela.iniciar(0, CHUNKS[:pacotes])
+    for seq in range(pacotes // 2):
+        janela.marcar_enviado(seq)
+    return janela
+
+
+def medir(fabrica, sessoes, pacotes):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    objetos = [fabrica(i, pacotes) for i in range(sessoes)]
+    tempo = time.perf_counter() - inicio
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objetos
+    return atual, tempo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de memória do estado de sessões/janelas")
+    parser.add_argument("--sessoes", type=int, default=10000)
+    parser.add_argument("--pacotes", type=int, default=8, help="Pacotes da mensagem em andamento (máx. 8)")
+    args = parser.parse_args()
+    pacotes = min(args.pacotes, len(CHUNKS))
+
+    print(f"{args.sessoes} sessões simultâneas, mensagem de {pacotes} pacotes em andamento")
+    print(f"{'estrutura':<32}{'total (MB)':>12}{'bytes/sessão':>14}{'criação (ms)':>14}")
+    for nome, fabrica in (('servidor: dict de sessão', sessao_dict), ('servidor: SessaoServidor', sessao_slots),
+                          ('cliente: dict de dicts', janela_dict), ('cliente: JanelaEnvio', janela_slots)):
+        memoria, tempo = medir(fabrica, args.sessoes, pacotes)
+        print(f"{nome:<32}{memoria / 1e6:>12.2f}{memoria / args.sessoes:>14.0f}{tempo * 1000:>14.1f}")
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import argparse
+import threading
+from cryptography.fernet import Fernet
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from server import CHAVE_SIMETRICA_FERNET, calcular_checksum
+from pipeline_cripto import PipelineCripto
+
+# =================================================================
+# BENCHMARK: descriptografia + checksum inline x pipeline em lote
+# =================================================================
+# Simula N sessões (threads de conexão) que recebem rajadas de `janela`
+# quadros cada e precisam do resultado em ordem, como no servidor.
+# Uso: python benchmarks/bench_pipeline_cripto.py --sessoes 8 --quadros 4000
+# =================================================================
+
+
+def gerar_quadros(total, payload):
+    fernet = Fernet(CHAVE_SIMETRICA_FERNET)
+    return [fernet.encrypt(payload.encode('utf-8')).decode() for _ in range(total)]
+
+
+def sessao_inline(fernet, quadros, janela):
+    for i in range(0, len(quadros), janela):
+        for q in quadros[i:i + janela]:
+            data = fernet.decrypt(q.encode('utf-8')).decode('utf-8')
+            calcular_checksum(data)
+
+
+def sessao_pipeline(pipeline, quadros, janela):
+    for i in range(0, len(quadros), janela):
+        pipeline.submeter(quadros[i:i + janela]).result()
+
+
+def executar(sessoes, alvo):
+    threads = [threading.Thread(target=alvo) for _ in range(sessoes)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline cripto em lote")
+    parser.add_argument("--sessoes", type=int, default=8)
+    parser.add_argument("--quadros", type=int, default=4000, help="Quadros por sessão")
+    parser.add_argument("--janela", type=int, default=5)
+    parser.add_argument("--payload", default="abcd")
+    parser.add_argument("--lote", type=int, default=None, help="Tamanho do lote (padrão: sessões x janela)")
+    parser.add_argument("--latencia_ms", type=float, default=2.0)
+    parser.add_argument("--workers", default="1,2,4", help="Lista de workers a testar")
+    args = parser.parse_args()
+
+    lote = args.lote or args.sessoes * args.janela
+    quadros = gerar_quadros(args.quadros, args.payload)
+    total = args.sessoes * args.quadros
+    print(f"{args.sessoes} sessões x {args.quadros} quadros (janela {args.janela}, lote {lote}) | CPUs: {os.cpu_count()}")
+    print(f"{'modo':<22}{'tempo (s)':>12}{'quadros/s':>14}{'speedup':>10}")
+
+    fernet = Fernet(CHAVE_SIMETRICA_FERNET)
+    base = executar(args.sessoes, lambda: sessao_inline(fernet, quadros, args.janela))
+    print(f"{'inline':<22}{base:>12.3f}{total / base:>14.0f}{1.0:>10.2f}")
+
+    for modo in ('thread', 'processo'):
+        for workers in (int(w) for w in args.workers.split(',')):
+            pipeline = PipelineCripto(CHAVE_SIMETRICA_FERNET, modo, workers, lote, args.latencia_ms / 1000.0)
+            pipeline.verificar(quadros[0])  # aquece os workers
+            tempo = executar(args.sessoes, lambda: sessao_pipeline(pipeline, quadros, args.janela))
+            pipeline.encerrar()
+            nome = f"{modo} x{workers}"
+            print(f"{nome:<22}{tempo:>12.3f}{total / tempo:>14.0f}{base / tempo:>10.2f}")
@@ -0,0 +1,91 @@
+import io
+import os
+import sys
+import time
+import argparse
+import threading
+import subprocess
+import contextlib
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+from client import Client
+from pool_conexoes import PoolConexoes
+
+# =================================================================
+# BENCHMARK: conexão nova por mensagem x pool de sessões negociadas
+# =================================================================
+# Sobe um servidor local (saída descartada), dispara `threads` threads
+# enviando `mensagens` mensagens cada e mede a latência por mensagem.
+# Uso: python benchmarks/bench_pool_conexoes.py --threads 4 --mensagens 50
+# =================================================================
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def sem_pool(host, port, protocol, mensagem, latencias):
+    inicio = time.perf_counter()
+    cliente = Client(host, port, protocol)
+    cliente.abrir()
+    cliente.enviar_mensagem(mensagem)
+    cliente.fechar()
+    latencias.append(time.perf_counter() - inicio)
+
+
+def com_pool(pool, host, port, protocol, mensagem, latencias):
+    inicio = time.perf_counter()
+    pool.enviar(host, port, mensagem, protocol)
+    latencias.append(time.perf_counter() - inicio)
+
+
+def executar(threads, mensagens, alvo):
+    latencias = []
+
+    def trabalho():
+        for _ in range(mensagens):
+            alvo(latencias)
+
+    ts = [threading.Thread(target=trabalho) for _ in range(threads)]
+    inicio = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return time.perf_counter() - inicio, latencias
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pool de conexões do cliente")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--protocol", choices=['gbn', 'sr'], default='gbn')
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--mensagens", type=int, default=50, help="Mensagens por thread")
+    parser.add_argument("--mensagem", default="mensagem de teste")
+    args = parser.parse_args()
+
+    host = '127.0.0.1'
+    servidor = subprocess.Popen([sys.executable, os.path.join(RAIZ, 'server.py'), '--port', str(args.port),
+                                 '--protocol', args.protocol], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1.0)
+    try:
+        pool = PoolConexoes(tamanho_max=args.threads)
+        with contextlib.redirect_stdout(io.StringIO()):
+            pool.aquecer(host, args.port, args.protocol, quantidade=args.threads)
+            tempo_sem, lat_sem = executar(args.threads, args.mensagens,
+                                          lambda lat: sem_pool(host, args.port, args.protocol, args.mensagem, lat))
+            tempo_com, lat_com = executar(args.threads, args.mensagens,
+                                          lambda lat: com_pool(pool, host, args.port, args.protocol, args.mensagem, lat))
+            pool.fechar()
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    total = args.threads * args.mensagens
+    print(f"{args.threads} threads x {args.mensagens} mensagens ({args.protocol})")
+    print(f"{'modo':<12}{'msgs/s':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+    for nome, tempo, lat in (('sem pool', tempo_sem, lat_sem), ('com pool', tempo_com, lat_com)):
+        print(f"{nome:<12}{total / tempo:>10.0f}{percentil(lat, 0.5) * 1000:>12.2f}{percentil(lat, 0.99) * 1000:>12.2f}")
+    print(f"Pool: {pool.estatisticas()}")
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from transmissao import CanalEnvio, definir_nodelay
+
+# =================================================================
+# BENCHMARK: um sendall por quadro x janela agrupada em um sendmsg
+# =================================================================
+# Emissor envia `janelas` rajadas de `janela` quadros (~200 bytes, como
+# um pacote de dados JSON) por TCP local; o receptor responde com um ACK
+# por rajada, como o ACK cumulativo do GBN. Mede chamadas de envio
+# (syscalls) e pacotes/s para diferentes tamanhos de janela.
+# Uso: python benchmarks/bench_transmissao.py --janelas 300 --tamanhos 5,16,64
+# =================================================================
+
+QUADRO = (b'{"type": "data", "sequence": 0, "data": "' + b'x' * 120 + b'", "checksum": "' + b'0' * 40 + b'"}\n')
+
+
+def receptor(servidor, janela, janelas, nodelay):
+    conn, _ = servidor.accept()
+    definir_nodelay(conn, nodelay)
+    esperado = len(QUADRO) * janela
+    with conn:
+        for _ in range(janelas):
+            recebido = 0
+            while recebido < esperado:
+                dados = conn.recv(65536)
+                if not dados:
+                    return
+                recebido += len(dados)
+            conn.sendall(b'{"type": "ack"}\n')
+
+
+def executar(janela, janelas, modo):
+    nodelay = modo != 'sendall + Nagle'
+    servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    servidor.bind(('127.0.0.1', 0))
+    servidor.listen(1)
+    t = threading.Thread(target=receptor, args=(servidor, janela, janelas, nodelay))
+    t.start()
+
+    sock = socket.create_connection(servidor.getsockname())
+    canal = CanalEnvio(sock, nodelay=nodelay)
+    syscalls = 0
+    inicio = time.perf_counter()
+    for _ in range(janelas):
+        if modo == 'sendmsg agrupado':
+            for _ in range(janela):
+                canal.enfileirar(QUADRO)
+            canal.descarregar()
+        else:
+            for _ in range(janela):
+                sock.sendall(QUADRO)
+                syscalls += 1
+        sock.recv(64)
+    tempo = time.perf_counter() - inicio
+    sock.close()
+    t.join()
+    servidor.close()
+    return tempo, canal.syscalls if modo == 'sendmsg agrupado' else syscalls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da camada de envio agrupado")
+    parser.add_argument("--janelas", type=int, default=300, help="Rajadas por execução")
+    parser.add_argument("--tamanhos", default="5,16,64", help="Tamanhos de janela a testar")
+    args = parser.parse_args()
+
+    print(f"{'janela':>7}  {'modo':<20}{'syscalls':>10}{'pacotes/s':>12}{'ms/janela':>11}")
+    for janela in (int(j) for j in args.tamanhos.split(',')):
+        for modo in ('sendall + Nagle', 'sendall + NODELAY', 'sendmsg agrupado'):
+            tempo, syscalls = executar(janela, args.janelas, modo)
+            pacotes = janela * args.janelas
+            print(f"{janela:>7}  {modo:<20}{syscalls:>10}{pacotes / tempo:>12.0f}{tempo / args.janelas * 1000:>11.3f}")
@@ -6,6 +6,8 @@ import ssl
 import hashlib
 from cryptography.fernet import Fernet 
 import base64
+from transmissao import CanalEnvio
+from estado import JanelaEnvio
 
 # =================================================================
 # VARIÁVEIS DE SEGURANÇA E INTEGRIDADE
@@ -25,8 +27,10 @@ class Client:
     MAX_RETRIES = 3
     # [REQUISITO: Temporizador] Timeout para pacotes SR (2 segundos)
     SR_TIMEOUT = 2.0  
+    # [0-RTT] Cache de tickets de sessão por "host:porta", compartilhado entre instâncias
+    tickets_sessao = {}
 
-    def __init__(self, server_addr='127.0.0.1', server_port=5005, protocol='gbn', max_chars=30, window_size=5, use_ssl=False, packet_size=4):
+    def __init__(self, server_addr='127.0.0.1', server_port=5005, protocol='gbn', max_chars=30, window_size=5, use_ssl=False, packet_size=4, fast_open=False, arquivo_tickets=None, nodelay=True, cork=False):
         self.server_addr = server_addr
         self.server_port = server_port
         self.protocol = protocol
@@ -47,13 +51,70 @@ class Client:
         self.packet_loss_mode = False
         self.fernet = Fernet(CHAVE_SIMETRICA_FERNET)
         
-        # Variáveis de Estado SR
-        self.sr_window_base = 0           
+        # Variáveis de Estado SR (anel pré-alocado indexado por seq % janela, ver estado.py)
         self.sr_next_seq_num = 0          
-        self.sr_packet_states = {}        
+        self.janela = JanelaEnvio(window_size)
+
+        self.sock = None
+        self._buffer_rx = ''
+        # Mensagem não confirmada: a base de sequência avançou mas o servidor ainda
+        # espera a anterior, então a sessão não pode ser reaproveitada (ver pool_conexoes.py)
+        self.dessincronizado = False
+        # Chave (host, porta, protocolo, packet_size) quando a sessão pertence a um PoolConexoes
+        self.chave_pool = None
+        # Envio agrupado: a janela inteira sai numa única chamada sendmsg (ver transmissao.py)
+        self.canal = None
+        self.nodelay = nodelay
+        self.cork = cork
+        # [0-RTT] Fast open: envia a primeira janela de dados junto com o SYN (requer ticket em cache)
+        self.fast_open = fast_open
+        self.arquivo_tickets = arquivo_tickets
+        if arquivo_tickets:
+            self.carregar_tickets(arquivo_tickets)
+
+    # =================================================================
+    # TICKETS DE SESSÃO (0-RTT)
+    # =================================================================
+    def _chave_ticket(self):
+        return f"{self.server_addr}:{self.server_port}"
+
+    @classmethod
+    def carregar_tickets(cls, caminho):
+        """Carrega tickets persistidos em disco para o cache em memória."""
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                cls.tickets_sessao.update(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def salvar_ticket(self, syn_ack):
+        """Guarda o ticket e os parâmetros negociados recebidos no SYN-ACK."""
+        ticket = syn_ack.get('ticket')
+        if not ticket:
+            return
+        Client.tickets_sessao[self._chave_ticket()] = {
+            'ticket': ticket,
+            'protocol': syn_ack.get('protocol', self.protocol),
+            'packet_size': self.packet_size,
+            'max_chars': syn_ack.get('max_chars', self.max_chars),
+            'window_size': syn_ack.get('window_size', self.window_size),
+        }
+        if self.arquivo_tickets:
+            with open(self.arquivo_tickets, 'w', encoding='utf-8') as f:
+                json.dump(Client.tickets_sessao, f)
+
+    def ticket_em_cache(self):
+        """Retorna o ticket válido para este servidor/protocolo/pacote, ou None."""
+        entrada = Client.tickets_sessao.get(self._chave_ticket())
+        if entrada and entrada['protocol'] == self.protocol and entrada['packet_size'] == self.packet_size:
+            return entrada
+        return None
 
-    def send_packet(self, sock, payload, seq_num, total_packets, is_last):
-        """Envia um pacote de dados segmentado, aplicando criptografia e injeção de erros."""
+    # =================================================================
+    # ENVIO E RECEPÇÃO DE PACOTES
+    # =================================================================
+    def montar_pacote(self, payload, seq_num, total_packets, is_last):
+        """Monta um pacote de dados (criptografia e injeção de erros). Retorna (pacote, checksum) ou (None, checksum) se perdido."""
         
         # [REQUISITO: Checksum] Checksum sobre o dado ORIGINAL
         checksum = calcular_checksum(payload)
@@ -76,7 +137,7 @@ class Client:
             print(f"[CLIENTE] !!! INJEÇÃO DE PERDA !!! Pacote #{seq_num} ({packet_index} na mensagem) NÃO ENVIADO.")
             # Desabilitar injeção após primeira perda para evitar loop infinito
             self.corrupt_message_seq = -2
-            return True
+            return None, checksum
 
         checksum_to_send = checksum
         if should_corrupt:
@@ -100,32 +161,63 @@ class Client:
             # [REQUISITO: Checksum] Envia o checksum (corrompido ou original)
             'checksum': checksum_to_send 
         }
+        return message_packet, checksum
 
-        sock.sendall((json.dumps(message_packet) + "\n").encode('utf-8'))
+    def _registrar_envio(self, payload, seq_num, checksum):
         self.packets_sent += 1
         print(f"[CLIENTE] Pacote #{seq_num} ({self.protocol}) enviado: '{payload}' | Checksum Original: {checksum}")
 
         # [REQUISITO: Temporizador] Inicia/reseta o temporizador ao enviar um pacote SR.
-        if self.protocol == 'sr' and seq_num in self.sr_packet_states:
-            self.sr_packet_states[seq_num]['sent'] = True
-            self.sr_packet_states[seq_num]['timer'] = time.time()
-            
+        if self.protocol == 'sr' and self.janela.na_janela(seq_num):
+            self.janela.marcar_enviado(seq_num)
+
+    def send_packet(self, sock, payload, seq_num, total_packets, is_last, adiar=False):
+        """Envia um pacote de dados segmentado, aplicando criptografia e injeção de erros.
+
+        Com `adiar=True` o pacote só é enfileirado; quem chama descarrega a janela com self.canal.descarregar().
+        """
+        message_packet, checksum = self.montar_pacote(payload, seq_num, total_packets, is_last)
+        if message_packet is None:
+            return True
+
+        dados = (json.dumps(message_packet) + "\n").encode('utf-8')
+        if self.canal is not None and self.canal.sock is sock:
+            self.canal.enfileirar(dados)
+            if not adiar:
+                self.canal.descarregar()
+        else:
+            sock.sendall(dados)
+        self._registrar_envio(payload, seq_num, checksum)
         return True
 
+    def receber_linha(self, sock, timeout=None):
+        """Lê uma mensagem (linha JSON) do socket, guardando o excedente para as próximas leituras."""
+        while '\n' not in self._buffer_rx:
+            sock.settimeout(timeout)
+            try:
+                data = sock.recv(2048)
+            finally:
+                sock.settimeout(None)
+            if not data:
+                return None
+            self._buffer_rx += data.decode('utf-8')
+        line, self._buffer_rx = self._buffer_rx.split('\n', 1)
+        return line
+
+    def descartar_recebidos(self):
+        """Descarta dados recebidos e ainda não lidos (ex.: ACKs atrasados da mensagem anterior)."""
+        self._buffer_rx = ''
+
     def receive_ack(self, sock):
         """Recebe ACK/NACK e gerencia timeouts."""
         # Configurar timeout baixo para checar se há ACKs pendentes
         try:
-            sock.settimeout(0.1) 
-            data = sock.recv(2048)
-            sock.settimeout(None)
-            if not data: return None
-
-            text = data.decode('utf-8')
-            lines = [l for l in text.split('\n') if l.strip()]
-            if not lines: return None
+            line = self.receber_linha(sock, 0.1)
+            while line is not None and not line.strip():
+                line = self.receber_linha(sock, 0.1)
+            if line is None: return None
 
-            ack = json.loads(lines[0])
+            ack = json.loads(line)
             if ack.get('type') == 'ack':
                 seq = ack.get('sequence')
                 status = ack.get('status')
@@ -143,8 +235,8 @@ class Client:
             return None
         return None
 
-    def connect(self):
-        """Gerencia o handshake, o envio de mensagens e a retransmissão."""
+    def abrir(self, primeira_mensagem=None):
+        """Abre a conexão e faz o handshake. Retorna quantos pacotes de `primeira_mensagem` já seguiram no SYN (0-RTT)."""
         raw_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         if self.use_ssl:
             context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
@@ -155,6 +247,12 @@ class Client:
             sock = raw_sock
         
         sock.connect((self.server_addr, self.server_port))
+        self.sock = sock
+        self.canal = CanalEnvio(sock, self.nodelay, self.cork)
+        self._buffer_rx = ''
+        # Nova sessão: o servidor espera a sequência a partir de 0
+        self.sequence_number_base = 0
+        self.dessincronizado = False
         
         # [REQUISITO: Handshake] SYN - Cliente NÃO propõe janela, servidor decide
         syn = {
@@ -163,11 +261,31 @@ class Client:
             'packet_size': self.packet_size
             # window_size REMOVIDO - servidor decide sozinho
         }
-        sock.sendall((json.dumps(syn) + "\n").encode('utf-8'))
-        print(f"[CLIENTE] SYN enviado: protocolo={self.protocol}, max_chars={self.max_chars}, packet_size={self.packet_size}")
+
+        # [0-RTT] Com ticket em cache, a primeira janela de dados segue junto com o SYN
+        early = []
+        # Injeção de falha agendada: montar_pacote a consome; é restaurada se o 0-RTT for recusado
+        injecao_agendada = self.corrupt_message_seq
+        ticket = self.ticket_em_cache() if self.fast_open and primeira_mensagem else None
+        if ticket:
+            self.max_chars = ticket['max_chars']
+            self.window_size = ticket['window_size']
+            chunks = self.segmentar(primeira_mensagem)
+            self.preparar_estado(chunks)
+            for i, chunk in enumerate(chunks[:self.window_size]):
+                pacote, checksum = self.montar_pacote(chunk, i, len(chunks), i == len(chunks) - 1)
+                early.append((chunk, i, checksum, pacote))
+            syn['ticket'] = ticket['ticket']
+            syn['early_data'] = [pacote for _, _, _, pacote in early if pacote is not None]
+
+        self.canal.enviar((json.dumps(syn) + "\n").encode('utf-8'))
+        for chunk, seq_num, checksum, pacote in early:
+            if pacote is not None:
+                self._registrar_envio(chunk, seq_num, checksum)
+        modo = f" (0-RTT: {len(early)} pacote(s) junto ao SYN)" if early else ""
+        print(f"[CLIENTE] SYN enviado: protocolo={self.protocol}, max_chars={self.max_chars}, packet_size={self.packet_size}{modo}")
         
-        data = sock.recv(1024)
-        syn_ack = json.loads(data.decode('utf-8'))
+        syn_ack = json.loads(self.receber_linha(sock))
         
         # [REQUISITO: Handshake] SYN-ACK Processamento
         self.session_id = syn_ack.get('session_id')
@@ -176,172 +294,164 @@ class Client:
         self.window_size = syn_ack.get('window_size', self.window_size)
         server_protocol = syn_ack.get('protocol', self.protocol)
         if server_protocol != self.protocol: self.protocol = server_protocol
+        self.salvar_ticket(syn_ack)
+        early_aceito = bool(early) and syn_ack.get('early_data_accepted', False)
 
-        # [REQUISITO: Handshake] ACK final
-        ack = {'session_id': self.session_id, 'message': 'Handshake completo'}
-        sock.sendall((json.dumps(ack) + "\n").encode('utf-8'))
         print(f"[CLIENTE] SYN-ACK recebido do servidor")
         print(f"[CLIENTE] Session ID: {self.session_id}")
         print(f"[CLIENTE] Tamanho máximo de mensagem: {self.max_chars} caracteres")
         print(f"[CLIENTE] Tamanho da janela negociado: {self.window_size}")
-        print(f"[CLIENTE] ACK enviado. Handshake concluído!")
+        if early_aceito:
+            # Ticket validado pelo servidor: a sessão já está estabelecida, não há ACK final
+            print(f"[CLIENTE] 0-RTT aceito: {len(early)} pacote(s) da primeira mensagem já entregues.")
+        else:
+            if early:
+                print(f"[CLIENTE] 0-RTT recusado pelo servidor. Os dados serão reenviados após o handshake.")
+                # O reenvio completo deve aplicar a falha pedida pelo usuário
+                self.corrupt_message_seq = injecao_agendada
+            # [REQUISITO: Handshake] ACK final
+            ack = {'session_id': self.session_id, 'message': 'Handshake completo'}
+            self.canal.enviar((json.dumps(ack) + "\n").encode('utf-8'))
+            print(f"[CLIENTE] ACK enviado. Handshake concluído!")
         print(f"\n{'='*60}")
         print("Pronto para enviar mensagens!")
         print(f"{'='*60}\n")
-        
-        while True:
-            print(f"\n[INFO] Mensagens enviadas: {self.messages_sent} | Confirmações (ACKs): {self.packets_confirmed}")
-            
-            # [REQUISITO: Simulação de erro/perda] Interação para definir a falha a ser injetada
-            self.corrupt_packet_index = -1
-            self.packet_loss_mode = False
-            self.corrupt_message_seq = -1
+        return len(early) if early_aceito else 0
+
+    def segmentar(self, mensagem):
+        """Trunca a mensagem ao limite negociado e a divide em chunks (pacotes)."""
+        if len(mensagem) > self.max_chars:
+            mensagem = mensagem[:self.max_chars]
+
+        print(f"[DEBUG] Mensagem FINAL antes da segmentação ({len(mensagem)} chars): '{mensagem}'")
+        # [REQUISITO: Segmentação] Divisão da mensagem em chunks (pacotes).
+        return [mensagem[i:i+self.packet_size] for i in range(0, len(mensagem), self.packet_size)]
+
+    def preparar_estado(self, chunks):
+        """Inicializa o estado de janela para a mensagem atual (usado apenas por SR)."""
+        self.sr_next_seq_num = self.sequence_number_base
+        # O anel só é realocado se a janela negociada mudou
+        if self.janela.capacidade != self.window_size:
+            self.janela = JanelaEnvio(self.window_size)
+        self.janela.iniciar(self.sequence_number_base, chunks)
+
+    def enviar_mensagem(self, mensagem, pre_enviados=0):
+        """Envia uma mensagem com retransmissão (GBN/SR). `pre_enviados` pacotes já seguiram via 0-RTT."""
+        sock = self.sock
+        chunks = self.segmentar(mensagem)
+        total_packets = len(chunks)
+        if pre_enviados:
+            # Estado já preparado em abrir(); os primeiros pacotes já foram enviados com o SYN
+            self.sr_next_seq_num = self.sequence_number_base + pre_enviados
+        else:
+            self.preparar_estado(chunks)
 
-            error_prompt = input("Deseja injetar falha na PRÓXIMA mensagem? ('c' - corromper / 'p' - perder / 'n' - normal): ").lower().strip()
-            
-            if error_prompt in ('c', 'p'):
-                self.corrupt_message_seq = self.messages_sent 
-                self.packet_loss_mode = (error_prompt == 'p')
-                while True:
-                    try:
-                        idx = int(input(f"Qual o ÍNDICE do pacote na mensagem a {'PERDER' if self.packet_loss_mode else 'CORROMPER'}? (0, 1, 2...): "))
-                        if idx >= 0:
-                            self.corrupt_packet_index = idx
-                            action = "Perda agendada" if self.packet_loss_mode else "Corrupção de Checksum agendada"
-                            print(f"{action} para o pacote {idx} da próxima mensagem.")
-                            break
-                        else:
-                            print("Índice deve ser >= 0.")
-                    except ValueError:
-                        print("Entrada inválida. Digite um número inteiro.")
+        # [REQUISITO: Retransmissão] Lógica de Retransmissão
+        tentativas = 0
+        mensagem_confirmada = False
+        
+        while tentativas < self.MAX_RETRIES and not mensagem_confirmada:
             
-            mensagem = input(f"Digite uma mensagem (máx. {self.max_chars} chars) ou 'sair': ")
+            if tentativas > 0:
+                print(f"\n[CLIENTE] >>> Tentativa de retransmissão #{tentativas + 1}...")
+                # Desativa a injeção de erro/perda nas retransmissões
+                self.corrupt_message_seq = -2 
 
-            if mensagem.lower() == 'sair':
-                close_packet = { 'type': 'close', 'session_id': self.session_id, 'message': 'Cliente desconectando' }
-                sock.sendall((json.dumps(close_packet) + "\n").encode('utf-8'))
-                break
-
-            if len(mensagem) > self.max_chars:
-                mensagem = mensagem[:self.max_chars]
+            if self.protocol == 'gbn':
+                
+                # (Lógica GBN: Envia tudo na janela e espera ACK cumulativo)
+                # Na primeira tentativa, pula os pacotes que já seguiram com o SYN (0-RTT)
+                inicio = pre_enviados if tentativas == 0 else 0
+                for i, chunk in enumerate(chunks):
+                    if i < inicio:
+                        continue
+                    seq_num_to_send = self.sequence_number_base + i
+                    is_last_packet = (i == total_packets - 1)
+                    self.send_packet(sock, chunk, seq_num_to_send, total_packets, is_last_packet, adiar=True)
+                # Toda a rajada numa única chamada de envio
+                self.canal.descarregar()
+
+                ack_response = self.receive_ack(sock) 
+                
+                if ack_response and ack_response.get('status') == 'ok':
+                    mensagem_confirmada = True
+                else:
+                    # [REQUISITO: Retransmissão] Se NACK ou Timeout em GBN, retransmite a mensagem inteira.
+                    tentativas += 1
 
-            print(f"[DEBUG] Mensagem FINAL antes da segmentação ({len(mensagem)} chars): '{mensagem}'")
-            # [REQUISITO: Segmentação] Divisão da mensagem em chunks (pacotes).
-            chunks = [mensagem[i:i+self.packet_size] for i in range(0, len(mensagem), self.packet_size)]
-            total_packets = len(chunks)
-            
-            # Inicialização para a mensagem atual (SR/GBN)
-            self.sr_window_base = self.sequence_number_base
-            self.sr_next_seq_num = self.sequence_number_base
-            self.sr_packet_states.clear()
-            
-            # Preencher o estado inicial de todos os pacotes da mensagem (usado apenas por SR)
-            for i, chunk in enumerate(chunks):
-                seq_num = self.sequence_number_base + i
-                self.sr_packet_states[seq_num] = {'sent': False, 'ack': False, 'data': chunk, 'timer': -1}
-
-            # [REQUISITO: Retransmissão] Lógica de Retransmissão
-            tentativas = 0
-            mensagem_confirmada = False
-            
-            while tentativas < self.MAX_RETRIES and not mensagem_confirmada:
+            elif self.protocol == 'sr':
                 
-                if tentativas > 0:
-                    print(f"\n[CLIENTE] >>> Tentativa de retransmissão #{tentativas + 1}...")
-                    # Desativa a injeção de erro/perda nas retransmissões
-                    self.corrupt_message_seq = -2 
-
-                if self.protocol == 'gbn':
-                    
-                    # (Lógica GBN: Envia tudo na janela e espera ACK cumulativo)
-                    for i, chunk in enumerate(chunks):
-                        seq_num_to_send = self.sequence_number_base + i
-                        is_last_packet = (i == total_packets - 1)
-                        self.send_packet(sock, chunk, seq_num_to_send, total_packets, is_last_packet)
-
-                    ack_response = self.receive_ack(sock) 
-                    
-                    if ack_response and ack_response.get('status') == 'ok':
-                        mensagem_confirmada = True
-                    else:
-                        # [REQUISITO: Retransmissão] Se NACK ou Timeout em GBN, retransmite a mensagem inteira.
-                        tentativas += 1
-
-                elif self.protocol == 'sr':
-                    
-                    # CORREÇÃO: Loop baseado em tempo máximo ao invés de contagem fixa
-                    max_sr_time = 30.0  # 30 segundos máximo para completar a mensagem
-                    sr_start_time = time.time()
-                    
-                    while not mensagem_confirmada and (time.time() - sr_start_time) < max_sr_time:
-                        packets_to_resend_now = False
-
-                        # [REQUISITO: Temporizador] Reenviar pacotes expirados (SR)
-                        current_time = time.time()
-                        for seq, state in self.sr_packet_states.items():
-                            if state['sent'] and not state['ack'] and state['timer'] != -1 and current_time - state['timer'] > self.SR_TIMEOUT:
-                                packets_to_resend_now = True
-                                state['sent'] = False # Marca para ser re-enviado
-
-                        # [REQUISITO: Janela] Enviar novos e re-enviar pacotes dentro da janela
-                        if packets_to_resend_now:
-                            print(f"[CLIENTE] >>> Retransmitindo pacotes expirados/NACKed.")
-                            
-                        # Itera por todos os pacotes na janela que ainda não foram confirmados
-                        for seq_num_to_send in range(self.sr_window_base, self.sequence_number_base + total_packets):
-                            if seq_num_to_send in self.sr_packet_states:
-                                packet_state = self.sr_packet_states[seq_num_to_send]
-                                
-                                # Se estiver na janela e não foi enviado (ou precisa ser re-enviado)
-                                if seq_num_to_send < self.sr_window_base + self.window_size and not packet_state['sent']:
-                                    
-                                    is_last_packet = (seq_num_to_send == self.sequence_number_base + total_packets - 1)
-                                    self.send_packet(sock, packet_state['data'], seq_num_to_send, total_packets, is_last_packet)
-                                    
-                                    if seq_num_to_send == self.sr_next_seq_num:
-                                         self.sr_next_seq_num += 1
-
-
-                        # [REQUISITO: ACK/NACK] Processar ACKs/NACKs recebidos
-                        while True:
-                            ack_response = self.receive_ack(sock) 
-                            if not ack_response or ack_response.get('status') == 'timeout':
-                                break 
-
-                            seq = ack_response.get('sequence')
-                            status = ack_response.get('status')
+                # CORREÇÃO: Loop baseado em tempo máximo ao invés de contagem fixa
+                max_sr_time = 30.0  # 30 segundos máximo para completar a mensagem
+                sr_start_time = time.time()
+                
+                while not mensagem_confirmada and (time.time() - sr_start_time) < max_sr_time:
+                    janela = self.janela
+
+                    # [REQUISITO: Temporizador] Reenviar pacotes expirados (SR) - marcados para ser re-enviados
+                    packets_to_resend_now = janela.expirar(time.time(), self.SR_TIMEOUT) > 0
+
+                    # [REQUISITO: Janela] Enviar novos e re-enviar pacotes dentro da janela
+                    if packets_to_resend_now:
+                        print(f"[CLIENTE] >>> Retransmitindo pacotes expirados/NACKed.")
+                        
+                    # Itera pelos pacotes da janela que ainda não foram confirmados
+                    for seq_num_to_send in range(janela.base, janela.limite()):
+                        # Se não foi enviado (ou precisa ser re-enviado)
+                        if not janela.enviado(seq_num_to_send) and not janela.confirmado(seq_num_to_send):
                             
-                            if seq in self.sr_packet_states:
-                                if status == 'ok':
-                                    self.sr_packet_states[seq]['ack'] = True
-                                    self.sr_packet_states[seq]['timer'] = -1 # Para o temporizador
-                                elif status == 'error':
-                                    # [REQUISITO: Retransmissão] NACK recebido (corrupção), forçar retransmissão seletiva imediata.
-                                    self.sr_packet_states[seq]['timer'] = 0 
-                                    self.sr_packet_states[seq]['sent'] = False
-                                    print(f"[CLIENTE] NACK recebido para pacote #{seq}. Agendando retransmissão.")
-
-                        # [REQUISITO: Janela] Avançar a base da janela (seletivamente)
-                        while self.sr_window_base in self.sr_packet_states and self.sr_packet_states[self.sr_window_base]['ack']:
-                            del self.sr_packet_states[self.sr_window_base]
-                            self.sr_window_base += 1
+                            is_last_packet = (seq_num_to_send == self.sequence_number_base + total_packets - 1)
+                            self.send_packet(sock, janela.dados(seq_num_to_send), seq_num_to_send, total_packets, is_last_packet, adiar=True)
                             
-                        # 5. Checar se a mensagem foi completamente confirmada
-                        if not self.sr_packet_states:
-                            mensagem_confirmada = True
+                            if seq_num_to_send == self.sr_next_seq_num:
+                                 self.sr_next_seq_num += 1
+
+                    # Novos pacotes e retransmissões da janela numa única chamada de envio
+                    self.canal.descarregar()
+
+                    # [REQUISITO: ACK/NACK] Processar ACKs/NACKs recebidos
+                    while True:
+                        ack_response = self.receive_ack(sock) 
+                        if not ack_response or ack_response.get('status') == 'timeout':
                             break 
-                    
-                    if not mensagem_confirmada:
-                        tentativas += 1 
-                        print(f"[CLIENTE] Timeout do SR (30s). Incrementando tentativas para {tentativas}.")
-
-            if mensagem_confirmada:
-                self.messages_sent += 1
-                # [REQUISITO: Número de sequência] Atualiza a base para a próxima mensagem.
-                self.sequence_number_base += total_packets
-            else:
-                print(f"[CLIENTE] Mensagem NÃO confirmada após {self.MAX_RETRIES} tentativas.")
-                self.sequence_number_base += total_packets 
+
+                        seq = ack_response.get('sequence')
+                        status = ack_response.get('status')
+                        
+                        if isinstance(seq, int) and janela.na_janela(seq):
+                            if status == 'ok':
+                                janela.marcar_confirmado(seq)
+                            elif status == 'error':
+                                # [REQUISITO: Retransmissão] NACK recebido (corrupção), forçar retransmissão seletiva imediata.
+                                janela.agendar_reenvio(seq)
+                                print(f"[CLIENTE] NACK recebido para pacote #{seq}. Agendando retransmissão.")
+
+                    # [REQUISITO: Janela] Avançar a base da janela (seletivamente)
+                    janela.avancar()
+                        
+                    # 5. Checar se a mensagem foi completamente confirmada
+                    if janela.completa():
+                        mensagem_confirmada = True
+                        break 
+                
+                if not mensagem_confirmada:
+                    tentativas += 1 
+                    print(f"[CLIENTE] Timeout do SR (30s). Incrementando tentativas para {tentativas}.")
+
+        if mensagem_confirmada:
+            self.messages_sent += 1
+            # [REQUISITO: Número de sequência] Atualiza a base para a próxima mensagem.
+            self.sequence_number_base += total_packets
+        else:
+            print(f"[CLIENTE] Mensagem NÃO confirmada após {self.MAX_RETRIES} tentativas.")
+            self.sequence_number_base += total_packets 
+            self.dessincronizado = True
+        return mensagem_confirmada
+
+    def fechar(self):
+        """Envia o pacote de encerramento, exibe as estatísticas e fecha o socket."""
+        close_packet = { 'type': 'close', 'session_id': self.session_id, 'message': 'Cliente desconectando' }
+        self.canal.enviar((json.dumps(close_packet) + "\n").encode('utf-8'))
 
         taxa_sucesso = (self.packets_confirmed/self.packets_sent*100) if self.packets_sent > 0 else 0
         
@@ -351,11 +461,67 @@ class Client:
         print(f"  • Total de pacotes individuais enviados: {self.packets_sent}")
         print(f"  • Total de confirmações (ACKs) recebidas: {self.packets_confirmed}")
         print(f"  • Taxa de sucesso (ACKs/Pacotes): {taxa_sucesso:.1f}%")
+        print(f"  • Chamadas de envio (syscalls): {self.canal.syscalls} para {self.canal.quadros_enviados} quadros")
         print(f"{'='*60}\n")
 
-        sock.close()
+        self.sock.close()
+        self.sock = None
         print("[CLIENTE] Conexão encerrada.")
 
+    def perguntar_mensagem(self):
+        """Pergunta a falha a injetar e a próxima mensagem. Retorna None se o usuário digitar 'sair'."""
+        print(f"\n[INFO] Mensagens enviadas: {self.messages_sent} | Confirmações (ACKs): {self.packets_confirmed}")
+        
+        # [REQUISITO: Simulação de erro/perda] Interação para definir a falha a ser injetada
+        self.corrupt_packet_index = -1
+        self.packet_loss_mode = False
+        self.corrupt_message_seq = -1
+
+        error_prompt = input("Deseja injetar falha na PRÓXIMA mensagem? ('c' - corromper / 'p' - perder / 'n' - normal): ").lower().strip()
+        
+        if error_prompt in ('c', 'p'):
+            self.corrupt_message_seq = self.messages_sent 
+            self.packet_loss_mode = (error_prompt == 'p')
+            while True:
+                try:
+                    idx = int(input(f"Qual o ÍNDICE do pacote na mensagem a {'PERDER' if self.packet_loss_mode else 'CORROMPER'}? (0, 1, 2...): "))
+                    if idx >= 0:
+                        self.corrupt_packet_index = idx
+                        action = "Perda agendada" if self.packet_loss_mode else "Corrupção de Checksum agendada"
+                        print(f"{action} para o pacote {idx} da próxima mensagem.")
+                        break
+                    else:
+                        print("Índice deve ser >= 0.")
+                except ValueError:
+                    print("Entrada inválida. Digite um número inteiro.")
+        
+        mensagem = input(f"Digite uma mensagem (máx. {self.max_chars} chars) ou 'sair': ")
+        if mensagem.lower() == 'sair':
+            return None
+        return mensagem
+
+    def connect(self):
+        """Gerencia o handshake, o envio de mensagens e a retransmissão."""
+        primeira_mensagem = None
+        if self.fast_open and self.ticket_em_cache():
+            # [0-RTT] A primeira mensagem é lida ANTES de conectar para seguir junto com o SYN
+            print("[CLIENTE] Ticket de sessão em cache: a primeira mensagem seguirá junto com o SYN (0-RTT).")
+            primeira_mensagem = self.perguntar_mensagem()
+            if primeira_mensagem is None:
+                return
+
+        pre_enviados = self.abrir(primeira_mensagem)
+        if primeira_mensagem is not None:
+            self.enviar_mensagem(primeira_mensagem, pre_enviados)
+        
+        while True:
+            mensagem = self.perguntar_mensagem()
+            if mensagem is None:
+                break
+            self.enviar_mensagem(mensagem)
+
+        self.fechar()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Cliente de Transporte Confiável")
     parser.add_argument("--host", default="127.0.0.1")
@@ -363,6 +529,10 @@ if __name__ == "__main__":
     parser.add_argument("--max_chars", type=int, default=30)
     parser.add_argument("--window_size", type=int, default=5, help="Tamanho da janela proposto (1-5)")
     parser.add_argument("--ssl", action='store_true', help="Ativar SSL/TLS (requer certificados)")
+    parser.add_argument("--no_nodelay", action='store_true', help="Desligar TCP_NODELAY no socket (volta ao algoritmo de Nagle)")
+    parser.add_argument("--cork", action='store_true', help="TCP_CORK durante cada envio agrupado (Linux)")
+    parser.add_argument("--fast_open", action='store_true', help="0-RTT: enviar a primeira janela de dados junto com o SYN (requer ticket de sessão anterior)")
+    parser.add_argument("--ticket_file", default=".tickets_sessao.json", help="Arquivo de cache dos tickets de sessão (0-RTT)")
     args = parser.parse_args()
 
     # CORREÇÃO: Validação robusta da escolha do protocolo
@@ -391,5 +561,7 @@ if __name__ == "__main__":
     # Garantir que window_size esteja entre 1 e 5
     window_size = max(1, min(5, args.window_size))
     
-    client = Client(args.host, args.port, chosen_protocol, args.max_chars, window_size, use_ssl, packet_size=chosen_packet_size)
+    client = Client(args.host, args.port, chosen_protocol, args.max_chars, window_size, use_ssl, packet_size=chosen_packet_size,
+                    fast_open=args.fast_open, arquivo_tickets=args.ticket_file if args.fast_open else None,
+                    nodelay=not args.no_nodelay, cork=args.cork)
     client.connect()
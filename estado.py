@@ -0,0 +1,162 @@
+import time
+from array import array
+
+# =================================================================
+# ESTADO COMPACTO DE SESSÕES E PACOTES EM TRÂNSITO
+# =================================================================
+# Classes com __slots__ (sem __dict__ por instância) e bitmaps em int
+# no lugar de dicts de dicts:
+#   - JanelaEnvio (cliente): anel de `capacidade` posições indexado por
+#     seq % capacidade, com bits de enviado/confirmado e timers em array.
+#   - SessaoServidor (servidor): contadores da sessão + vetor de
+#     remontagem pré-alocado, indexado por (seq - base da mensagem),
+#     com bitmap dos pacotes recebidos. A remontagem é O(n), sem sort.
+# =================================================================
+
+
+class JanelaEnvio:
+    """Estado da janela de envio SR: pacotes [base, fim) da mensagem atual."""
+    __slots__ = ('capacidade', 'base', 'fim', 'base_msg', 'chunks', 'enviados', 'confirmados', 'timers')
+
+    def __init__(self, capacidade):
+        self.capacidade = max(1, capacidade)
+        self.base = 0               # Primeiro pacote ainda não confirmado
+        self.fim = 0                # Um após o último pacote da mensagem
+        self.base_msg = 0           # Sequência do primeiro pacote da mensagem
+        self.chunks = ()
+        self.enviados = 0           # Bitmap por posição do anel
+        self.confirmados = 0        # Bitmap por posição do anel
+        self.timers = array('d', [-1.0]) * self.capacidade
+
+    def iniciar(self, base_seq, chunks):
+        """Prepara a janela para uma nova mensagem (reaproveita o anel pré-alocado)."""
+        self.base = self.base_msg = base_seq
+        self.fim = base_seq + len(chunks)
+        self.chunks = chunks
+        self.enviados = 0
+        self.confirmados = 0
+        for i in range(self.capacidade):
+            self.timers[i] = -1.0
+
+    def na_janela(self, seq):
+        return self.base <= seq < self.fim and seq < self.base + self.capacidade
+
+    def limite(self):
+        """Um após o último número de sequência que pode ser enviado agora."""
+        return min(self.base + self.capacidade, self.fim)
+
+    def dados(self, seq):
+        return self.chunks[seq - self.base_msg]
+
+    def enviado(self, seq):
+        return self.enviados >> (seq % self.capacidade) & 1
+
+    def confirmado(self, seq):
+        return self.confirmados >> (seq % self.capacidade) & 1
+
+    def timer(self, seq):
+        return self.timers[seq % self.capacidade]
+
+    def marcar_enviado(self, seq, instante=None):
+        pos = seq % self.capacidade
+        self.enviados |= 1 << pos
+        self.timers[pos] = time.time() if instante is None else instante
+
+    def marcar_confirmado(self, seq):
+        pos = seq % self.capacidade
+        self.confirmados |= 1 << pos
+        self.timers[pos] = -1.0     # Para o temporizador
+
+    def agendar_reenvio(self, seq):
+        """NACK: limpa o bit de enviado para retransmissão imediata."""
+        pos = seq % self.capacidade
+        self.enviados &= ~(1 << pos)
+        self.timers[pos] = 0.0
+
+    def expirar(self, agora, timeout):
+        """Marca para reenvio os pacotes enviados, não confirmados e com timer vencido. Retorna quantos."""
+        expirados = 0
+        for seq in range(self.base, self.limite()):
+            pos = seq % self.capacidade
+            bit = 1 << pos
+            timer = self.timers[pos]
+            if self.enviados & bit and not self.confirmados & bit and timer != -1.0 and agora - timer > timeout:
+                self.enviados &= ~bit
+                expirados += 1
+        return expirados
+
+    def avancar(self):
+        """Desliza a base sobre os pacotes confirmados, liberando suas posições do anel."""
+        while self.base < self.fim:
+            pos = self.base % self.capacidade
+            bit = 1 << pos
+            if not self.confirmados & bit:
+                break
+            self.enviados &= ~bit
+            self.confirmados &= ~bit
+            self.timers[pos] = -1.0
+            self.base += 1
+
+    def completa(self):
+        return self.base >= self.fim
+
+
+class SessaoServidor:
+    """Estado de uma sessão no servidor (substitui o dict de 14 chaves)."""
+    __slots__ = (
+        'session_id', 'handshake_complete', 'packets_received', 'acks_sent', 'messages_complete',
+        'start_time', 'protocol', 'corrupted', 'expected_seq_num', 'total_packets_msg',
+        'msg_base_seq', 'window_size', 'max_payload', 'remontagem', 'recebidos', 'recebidos_msg',
+    )
+
+    def __init__(self, session_id, protocol, window_size, max_payload, capacidade_msg, handshake_complete=False):
+        self.session_id = session_id
+        self.handshake_complete = handshake_complete
+        self.packets_received = 0
+        self.acks_sent = 0
+        self.messages_complete = 0      # Contador de mensagens completas recebidas
+        self.start_time = time.time()
+        self.protocol = protocol
+        self.corrupted = False          # Estado de corrupção da mensagem atual (GBN)
+        self.expected_seq_num = 0       # Próxima sequência esperada (base da janela SR/GBN)
+        self.total_packets_msg = 0      # Total de pacotes esperados para a mensagem
+        self.msg_base_seq = 0           # Sequência do primeiro pacote da mensagem atual
+        self.window_size = window_size  # Janela negociada
+        self.max_payload = max_payload
+        # Vetor de remontagem pré-alocado (GBN em ordem / SR fora de ordem)
+        self.remontagem = [None] * max(1, capacidade_msg)
+        self.recebidos = 0              # Bitmap dos índices já recebidos na mensagem atual
+        self.recebidos_msg = 0          # Quantidade de pacotes guardados na mensagem atual
+
+    def buffer_vazio(self):
+        return self.recebidos == 0
+
+    def tem(self, sequence):
+        indice = sequence - self.msg_base_seq
+        return indice >= 0 and self.recebidos >> indice & 1
+
+    def armazenar(self, sequence, data):
+        indice = sequence - self.msg_base_seq
+        if indice >= len(self.remontagem):
+            # Mensagem maior que a capacidade negociada: cresce o vetor
+            self.remontagem.extend([None] * (indice + 1 - len(self.remontagem)))
+        self.remontagem[indice] = data
+        self.recebidos |= 1 << indice
+        self.recebidos_msg += 1
+
+    def remontar(self):
+        """Concatena os pacotes contíguos a partir da base da mensagem (O(n), sem ordenação)."""
+        return ''.join(self.remontagem[:self.recebidos_msg])
+
+    def limpar_mensagem(self, proxima_base):
+        """Libera o vetor de remontagem e posiciona a base da próxima mensagem."""
+        recebidos, indice = self.recebidos, 0
+        while recebidos:
+            if recebidos & 1:
+                self.remontagem[indice] = None
+            recebidos >>= 1
+            indice += 1
+        self.recebidos = 0
+        self.recebidos_msg = 0
+        self.total_packets_msg = 0
+        self.msg_base_seq = proxima_base
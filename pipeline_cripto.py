@@ -0,0 +1,186 @@
+import time
+import queue
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from cryptography.fernet import Fernet
+
+# =================================================================
+# PIPELINE DE DESCRIPTOGRAFIA E INTEGRIDADE EM LOTE
+# =================================================================
+# Cada thread de conexão submete os quadros de dados de um bloco recebido
+# e recebe um Future com os resultados desse bloco, na mesma ordem. Uma
+# thread agrupadora junta blocos de TODAS as sessões em lotes (até
+# `tamanho_lote` quadros ou `latencia_max` segundos) e despacha cada lote
+# para um pool de processos (fora do GIL) ou de threads. Como cada thread
+# consome seus resultados na ordem em que submeteu, a ordem por sessão do
+# GBN/SR é preservada.
+# =================================================================
+
+MODOS = ('processo', 'thread')
+
+# Fernet do worker (uma instância por processo, criada no inicializador)
+_fernet_worker = None
+
+
+def _inicializar_worker(chave):
+    global _fernet_worker
+    _fernet_worker = Fernet(chave)
+
+
+def verificar_lote(itens):
+    """Descriptografa e calcula o SHA-1 de cada item (data_encriptada_str) do lote.
+
+    Retorna uma lista de tuplas (data, checksum_calculado, erro) na mesma ordem.
+    """
+    fernet = _fernet_worker
+    resultados = []
+    for data_encriptada_str in itens:
+        try:
+            data = fernet.decrypt(data_encriptada_str.encode('utf-8')).decode('utf-8')
+            erro = None
+        except Exception as e:
+            data = ""
+            erro = str(e) or type(e).__name__
+        # Mesmo checksum de calcular_checksum() no servidor/cliente (SHA-1 do texto)
+        resultados.append((data, hashlib.sha1(data.encode('utf-8')).hexdigest(), erro))
+    return resultados
+
+
+MAX_RECRIACOES = 5          # Executor quebrado mais vezes que isso desativa o pipeline
+
+
+class PipelineCripto:
+    def __init__(self, chave, modo='processo', workers=None, tamanho_lote=32, latencia_max=0.002, timeout=5.0):
+        if modo not in MODOS:
+            raise ValueError(f"Modo inválido: {modo} (use {' ou '.join(MODOS)})")
+        self.chave = chave
+        self.modo = modo
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.latencia_max = max(0.0, latencia_max)
+        self.timeout = timeout      # Espera máxima pelo resultado de um bloco (result(timeout=...))
+        self.lotes_enviados = 0
+        self.itens_processados = 0
+        self.recriacoes = 0
+        self.desativado = False
+        self._encerrado = False
+        self._lock = threading.Lock()
+
+        self.executor = self._criar_executor(workers)
+        self.workers = self.executor._max_workers
+
+        self._fila = queue.Queue()
+        self._agrupador = threading.Thread(target=self._loop_agrupador, daemon=True)
+        self._agrupador.start()
+
+    def _criar_executor(self, workers):
+        if self.modo == 'processo':
+            # 'spawn' evita fork de um processo que já tem threads de conexão
+            return ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_worker,
+                initargs=(self.chave,),
+            )
+        _inicializar_worker(self.chave)
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cripto')
+
+    def ativo(self):
+        """False se o pipeline foi desativado (executor irrecuperável) ou a thread agrupadora morreu."""
+        return not self.desativado and not self._encerrado and self._agrupador.is_alive()
+
+    def _recriar_executor(self, quebrado, erro):
+        """Substitui um executor quebrado (ex.: worker morto -> BrokenProcessPool)."""
+        with self._lock:
+            if self.executor is not quebrado or self._encerrado:
+                return      # Outra thread já recriou (ou o pipeline está encerrando)
+            quebrado.shutdown(wait=False)
+            if self.recriacoes >= MAX_RECRIACOES:
+                self.desativado = True
+                print(f"[PIPELINE] Executor quebrado ({erro}) - pipeline desativado, cripto volta a ser inline")
+                return
+            self.recriacoes += 1
+            print(f"[PIPELINE] Executor quebrado ({erro}) - recriando ({self.recriacoes}/{MAX_RECRIACOES})")
+            try:
+                self.executor = self._criar_executor(self.workers)
+            except Exception as e:
+                self.desativado = True
+                print(f"[PIPELINE] Falha ao recriar o executor ({e}) - pipeline desativado")
+
+    def submeter(self, quadros):
+        """Enfileira uma lista de quadros e devolve um Future com a lista de (data, checksum_calculado, erro)."""
+        futuro = Future()
+        self._fila.put((quadros, futuro))
+        return futuro
+
+    def verificar(self, data_encriptada_str):
+        """Versão síncrona para um único quadro (bloqueia até o resultado)."""
+        return self.submeter([data_encriptada_str]).result(self.timeout)[0]
+
+    def _loop_agrupador(self):
+        fila = self._fila
+        while True:
+            item = fila.get()
+            if item is None:
+                return
+            lote = [item]
+            tamanho = len(item[0])
+            # Completa o lote até o tamanho máximo ou até estourar a latência
+            # permitida, contada a partir do primeiro bloco do lote
+            prazo = time.monotonic() + self.latencia_max
+            encerrar = False
+            while tamanho < self.tamanho_lote:
+                restante = prazo - time.monotonic()
+                try:
+                    item = fila.get(timeout=restante) if restante > 0 else fila.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    encerrar = True
+                    break
+                lote.append(item)
+                tamanho += len(item[0])
+            self._despachar(lote)
+            if encerrar:
+                return
+
+    def _despachar(self, lote):
+        futuros = [futuro for _, futuro in lote]
+        quadros = [quadro for bloco, _ in lote for quadro in bloco]
+        executor = self.executor
+        try:
+            if self.desativado:
+                raise RuntimeError("pipeline desativado")
+            resultado_lote = executor.submit(verificar_lote, quadros)
+        except RuntimeError as e:
+            # Executor encerrado ou quebrado: as threads de conexão caem para o caminho inline
+            if not self._encerrado and not self.desativado:
+                self._recriar_executor(executor, e)
+            for futuro in futuros:
+                futuro.set_exception(e)
+            return
+        self.lotes_enviados += 1
+
+        def distribuir(f):
+            try:
+                resultados = f.result()
+            except Exception as e:
+                # verificar_lote não lança: uma exceção aqui é falha do executor
+                self._recriar_executor(executor, e)
+                for futuro in futuros:
+                    futuro.set_exception(e)
+                return
+            self.itens_processados += len(resultados)
+            inicio = 0
+            for bloco, futuro in lote:
+                futuro.set_result(resultados[inicio:inicio + len(bloco)])
+                inicio += len(bloco)
+
+        resultado_lote.add_done_callback(distribuir)
+
+    def encerrar(self):
+        self._encerrado = True
+        self._fila.put(None)
+        self._agrupador.join(timeout=1.0)
+        self.executor.shutdown(wait=True)
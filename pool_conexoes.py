@@ -0,0 +1,259 @@
+import ssl
+import time
+import select
+import threading
+from collections import deque
+from contextlib import contextmanager
+from client import Client
+
+# =================================================================
+# POOL DE CONEXÕES DO CLIENTE
+# =================================================================
+# Mantém sessões já negociadas (handshake concluído) por chave
+# (host, porta, protocolo, packet_size) e as empresta às threads da
+# aplicação, de modo que a latência por mensagem não inclua conexão,
+# SSL nem handshake. Conexões ociosas demais ou quebradas são
+# descartadas; o total de conexões abertas é limitado a `tamanho_max`.
+#
+# Uso:
+#   pool = PoolConexoes(tamanho_max=8)
+#   with pool.conexao('127.0.0.1', 5005, 'sr', 4) as cliente:
+#       cliente.enviar_mensagem("ola")
+#   pool.fechar()
+# =================================================================
+
+
+class PoolConexoes:
+    def __init__(self, tamanho_max=8, ocioso_max=60.0, intervalo_limpeza=10.0, use_ssl=False):
+        self.tamanho_max = max(1, tamanho_max)
+        self.ocioso_max = ocioso_max
+        self.use_ssl = use_ssl
+        self._ociosos = {}          # chave -> deque de (cliente, último uso)
+        self._total = 0             # conexões abertas (ociosas + emprestadas)
+        self._fechado = False
+        self._cond = threading.Condition()
+        # Estatísticas
+        self.criadas = 0
+        self.reutilizadas = 0
+        self.descartadas = 0
+
+        self._parar = threading.Event()
+        self._limpador = None
+        if intervalo_limpeza and intervalo_limpeza > 0:
+            self._limpador = threading.Thread(target=self._loop_limpeza, args=(intervalo_limpeza,), daemon=True)
+            self._limpador.start()
+
+    # -----------------------------------------------------------------
+    # Empréstimo e devolução
+    # -----------------------------------------------------------------
+    def obter(self, host, port, protocol='gbn', packet_size=4, timeout=None):
+        """Empresta um Client já conectado para a chave pedida (bloqueia se o pool estiver cheio)."""
+        chave = (host, port, protocol, packet_size)
+        prazo = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            despejar = None
+            with self._cond:
+                if self._fechado:
+                    raise RuntimeError("Pool de conexões fechado")
+                fila = self._ociosos.get(chave)
+                if fila:
+                    # LIFO: a conexão usada mais recentemente tem menos chance de ter expirado
+                    cliente, _ = fila.pop()
+                elif self._total < self.tamanho_max:
+                    self._total += 1
+                    cliente = None
+                else:
+                    # Pool cheio: libera uma conexão ociosa de outra chave, se houver
+                    despejar = self._remover_ocioso_mais_antigo()
+                    if despejar is None:
+                        restante = None if prazo is None else prazo - time.monotonic()
+                        if restante is not None and restante <= 0:
+                            raise TimeoutError(f"Nenhuma conexão disponível para {host}:{port} em {timeout}s")
+                        self._cond.wait(restante)
+                        continue
+                    self._total += 1
+                    cliente = None
+
+            if despejar is not None:
+                self._encerrar(despejar)
+            if cliente is None:
+                return self._criar(chave)
+            if self._saudavel(cliente):
+                with self._cond:
+                    self.reutilizadas += 1
+                return cliente
+            # Conexão quebrada: descarta e tenta de novo
+            self._descartar(cliente)
+
+    def devolver(self, cliente, quebrado=False):
+        """Devolve um Client ao pool; conexões quebradas, dessincronizadas (mensagem não
+        confirmada) ou com o pool fechado são descartadas."""
+        if quebrado or cliente.sock is None or cliente.dessincronizado:
+            self._descartar(cliente)
+            return
+        with self._cond:
+            if not self._fechado:
+                self._ociosos.setdefault(cliente.chave_pool, deque()).append((cliente, time.monotonic()))
+                self._cond.notify()
+                return
+        self._descartar(cliente, educado=True)
+
+    @contextmanager
+    def conexao(self, host, port, protocol='gbn', packet_size=4, timeout=None):
+        """Contexto que empresta um Client e o devolve (ou descarta, se houver erro)."""
+        cliente = self.obter(host, port, protocol, packet_size, timeout)
+        try:
+            yield cliente
+        except BaseException:
+            self.devolver(cliente, quebrado=True)
+            raise
+        else:
+            self.devolver(cliente)
+
+    def enviar(self, host, port, mensagem, protocol='gbn', packet_size=4, timeout=None):
+        """Envia uma mensagem usando uma sessão do pool. Retorna True se confirmada."""
+        with self.conexao(host, port, protocol, packet_size, timeout) as cliente:
+            # Se não for confirmada, devolver() descarta a sessão dessincronizada
+            return cliente.enviar_mensagem(mensagem)
+
+    def aquecer(self, host, port, protocol='gbn', packet_size=4, quantidade=1):
+        """Abre `quantidade` sessões antecipadamente (handshake fora do caminho da mensagem)."""
+        clientes = []
+        try:
+            for _ in range(quantidade):
+                clientes.append(self.obter(host, port, protocol, packet_size, timeout=0))
+        except TimeoutError:
+            pass
+        finally:
+            for cliente in clientes:
+                self.devolver(cliente)
+        return len(clientes)
+
+    # -----------------------------------------------------------------
+    # Criação, verificação e descarte
+    # -----------------------------------------------------------------
+    def _criar(self, chave):
+        host, port, protocol, packet_size = chave
+        cliente = Client(host, port, protocol, use_ssl=self.use_ssl, packet_size=packet_size)
+        cliente.chave_pool = chave
+        try:
+            cliente.abrir()
+        except BaseException:
+            if cliente.sock is not None:
+                cliente.sock.close()
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.criadas += 1
+        return cliente
+
+    def _saudavel(self, cliente):
+        """Verifica se o socket ainda está aberto, descartando ACKs atrasados pendentes."""
+        sock = cliente.sock
+        if sock is None:
+            return False
+        try:
+            sock.setblocking(False)
+            try:
+                while True:
+                    pendente = isinstance(sock, ssl.SSLSocket) and sock.pending()
+                    if not pendente and not select.select([sock], [], [], 0)[0]:
+                        break
+                    try:
+                        dados = sock.recv(4096)
+                    except (BlockingIOError, ssl.SSLWantReadError):
+                        break
+                    if not dados:
+                        return False    # servidor fechou a conexão
+            finally:
+                sock.setblocking(True)
+        except (OSError, ValueError):
+            return False
+        # ACKs atrasados (ex.: duplicados do SR) não pertencem à próxima mensagem
+        cliente.descartar_recebidos()
+        return True
+
+    def _remover_ocioso_mais_antigo(self):
+        """Remove (sob o lock) a conexão ociosa mais antiga de qualquer chave."""
+        mais_antiga = None
+        for chave, fila in self._ociosos.items():
+            if fila and (mais_antiga is None or fila[0][1] < self._ociosos[mais_antiga][0][1]):
+                mais_antiga = chave
+        if mais_antiga is None:
+            return None
+        cliente, _ = self._ociosos[mais_antiga].popleft()
+        if not self._ociosos[mais_antiga]:
+            del self._ociosos[mais_antiga]
+        self._total -= 1
+        self.descartadas += 1
+        return cliente
+
+    def _descartar(self, cliente, educado=False):
+        with self._cond:
+            self._total -= 1
+            self.descartadas += 1
+            self._cond.notify()
+        if educado:
+            self._encerrar(cliente)
+        elif cliente.sock is not None:
+            cliente.sock.close()
+            cliente.sock = None
+
+    def _encerrar(self, cliente):
+        """Fecha uma sessão saudável com CLOSE (o servidor registra as estatísticas)."""
+        try:
+            cliente.fechar()
+        except OSError:
+            if cliente.sock is not None:
+                cliente.sock.close()
+                cliente.sock = None
+
+    def limpar_ociosos(self):
+        """Encerra as conexões ociosas há mais de `ocioso_max` segundos."""
+        limite = time.monotonic() - self.ocioso_max
+        expirados = []
+        with self._cond:
+            for chave in list(self._ociosos):
+                fila = self._ociosos[chave]
+                while fila and fila[0][1] < limite:
+                    expirados.append(fila.popleft()[0])
+                if not fila:
+                    del self._ociosos[chave]
+            self._total -= len(expirados)
+            self.descartadas += len(expirados)
+            if expirados:
+                self._cond.notify_all()
+        for cliente in expirados:
+            self._encerrar(cliente)
+        return len(expirados)
+
+    def _loop_limpeza(self, intervalo):
+        while not self._parar.wait(intervalo):
+            self.limpar_ociosos()
+
+    def fechar(self):
+        """Fecha o pool e todas as conexões ociosas (as emprestadas são fechadas na devolução)."""
+        self._parar.set()
+        with self._cond:
+            self._fechado = True
+            ociosos = [cliente for fila in self._ociosos.values() for cliente, _ in fila]
+            self._ociosos.clear()
+            self._total -= len(ociosos)
+            self._cond.notify_all()
+        for cliente in ociosos:
+            self._encerrar(cliente)
+
+    def estatisticas(self):
+        with self._cond:
+            ociosas = sum(len(fila) for fila in self._ociosos.values())
+            return {
+                'abertas': self._total,
+                'ociosas': ociosas,
+                'emprestadas': self._total - ociosas,
+                'criadas': self.criadas,
+                'reutilizadas': self.reutilizadas,
+                'descartadas': self.descartadas,
+            }
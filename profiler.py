@@ -0,0 +1,386 @@
+import os
+import sys
+import time
+import json
+import math
+import signal
+import socket
+import threading
+import cProfile
+import pstats
+import tracemalloc
+
+# =================================================================
+# PERFILAMENTO SOB DEMANDA DO SERVIDOR
+# =================================================================
+# Controles acionados em tempo de execução (sinal ou socket local):
+#   - Captura cProfile por N segundos  -> arquivo .prof (formato pstats)
+#   - Diferença de snapshots tracemalloc -> .tracemalloc + resumo .txt
+#   - Temporizadores por fase do pipeline de pacotes -> .json
+#
+# Sinais (POSIX):
+#   SIGUSR1 -> captura cProfile (DURACAO_PADRAO segundos)
+#   SIGUSR2 -> diferença tracemalloc (DURACAO_PADRAO segundos)
+#
+# Socket de controle (somente 127.0.0.1), um comando por linha:
+#   cprofile [N] | tracemalloc [N] | timers on|off|dump|reset | status
+# =================================================================
+
+DURACAO_PADRAO = 10
+TIMEOUT_CONTROLE = 30.0     # Conexão de controle ociosa é encerrada após este tempo
+
+# A partir do Python 3.12 o cProfile usa sys.monitoring: só um Profile pode
+# estar ativo no processo inteiro, e ele já perfila todas as threads.
+PERFIL_GLOBAL = sys.version_info >= (3, 12)
+
+
+class _SemMedicao:
+    """Contexto vazio devolvido quando o perfilamento está desligado."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_SEM_MEDICAO = _SemMedicao()
+
+
+class _MedicaoFase:
+    """Mede o tempo de uma fase do pipeline e acumula no Profiler."""
+    __slots__ = ('profiler', 'nome', 'inicio')
+
+    def __init__(self, profiler, nome):
+        self.profiler = profiler
+        self.nome = nome
+        self.inicio = 0.0
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._acumular(self.nome, time.perf_counter() - self.inicio)
+        return False
+
+
+class _CapturaCProfile:
+    """Estado de uma captura cProfile em andamento.
+
+    Até o Python 3.11 há um Profile por thread, habilitado em cada bloco;
+    no 3.12+ um único Profile do processo fica ligado durante toda a janela.
+    """
+
+    def __init__(self):
+        self.perfis = []
+        self.local = threading.local()
+        self.ativos = 0
+        self.cond = threading.Condition()
+        self.global_ = None
+
+    def iniciar_global(self):
+        perfil = cProfile.Profile()
+        perfil.enable()             # ValueError se outra ferramenta já perfila o processo
+        self.global_ = perfil
+        self.perfis.append(perfil)
+
+    def parar_global(self):
+        if self.global_ is not None:
+            try:
+                self.global_.disable()
+            except ValueError:
+                pass
+            self.global_ = None
+
+
+class _BlocoCProfile:
+    """Habilita o cProfile da thread atual durante um bloco de processamento.
+
+    Erros do profiler nunca chegam ao caminho dos pacotes: o bloco apenas
+    deixa de ser medido.
+    """
+    __slots__ = ('captura', 'perfil')
+
+    def __init__(self, captura):
+        self.captura = captura
+        self.perfil = None
+
+    def __enter__(self):
+        captura = self.captura
+        try:
+            perfil = getattr(captura.local, 'perfil', None)
+            novo = perfil is None
+            if novo:
+                perfil = cProfile.Profile()
+            perfil.enable()
+        except Exception:
+            return self
+        with captura.cond:
+            if novo:
+                captura.local.perfil = perfil
+                captura.perfis.append(perfil)
+            captura.ativos += 1
+        self.perfil = perfil
+        return self
+
+    def __exit__(self, *exc):
+        if self.perfil is None:
+            return False
+        try:
+            self.perfil.disable()
+        except Exception:
+            pass
+        self.perfil = None
+        with self.captura.cond:
+            self.captura.ativos -= 1
+            self.captura.cond.notify_all()
+        return False
+
+
+class Profiler:
+    def __init__(self, diretorio='perfis', porta_controle=None, host_controle='127.0.0.1'):
+        self.diretorio = diretorio
+        self.porta_controle = porta_controle
+        self.host_controle = host_controle
+        # Flags lidas no caminho crítico: apenas um teste de atributo quando desligado.
+        self.timers_ativos = False
+        self._captura = None
+        self._tempos = {}           # fase -> [contagem, total, máximo]
+        self._lock = threading.Lock()
+        self._tracemalloc_ocupado = False
+        self._sock_controle = None
+
+    # -----------------------------------------------------------------
+    # Ganchos do caminho crítico
+    # -----------------------------------------------------------------
+    def fase(self, nome):
+        """Contexto que mede a fase `nome` quando os temporizadores estão ativos."""
+        if not self.timers_ativos:
+            return _SEM_MEDICAO
+        return _MedicaoFase(self, nome)
+
+    def bloco(self):
+        """Contexto que perfila o bloco atual se houver captura cProfile em andamento."""
+        captura = self._captura
+        if captura is None or captura.global_ is not None:
+            return _SEM_MEDICAO
+        return _BlocoCProfile(captura)
+
+    def _acumular(self, nome, duracao):
+        with self._lock:
+            estat = self._tempos.get(nome)
+            if estat is None:
+                self._tempos[nome] = [1, duracao, duracao]
+            else:
+                estat[0] += 1
+                estat[1] += duracao
+                if duracao > estat[2]:
+                    estat[2] = duracao
+
+    # -----------------------------------------------------------------
+    # Temporizadores por fase
+    # -----------------------------------------------------------------
+    def ligar_timers(self):
+        self.timers_ativos = True
+        print("[PERFIL] Temporizadores por fase ATIVADOS")
+
+    def desligar_timers(self):
+        self.timers_ativos = False
+        print("[PERFIL] Temporizadores por fase DESATIVADOS")
+
+    def resetar_timers(self):
+        with self._lock:
+            self._tempos.clear()
+
+    def resumo_timers(self):
+        with self._lock:
+            return {
+                nome: {
+                    'contagem': c,
+                    'total_s': total,
+                    'media_us': (total / c) * 1e6 if c else 0.0,
+                    'max_us': maximo * 1e6,
+                }
+                for nome, (c, total, maximo) in self._tempos.items()
+            }
+
+    def salvar_timers(self):
+        caminho = self._caminho('timers', 'json')
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.resumo_timers(), f, indent=2, ensure_ascii=False)
+        print(f"[PERFIL] Temporizadores salvos em {caminho}")
+        return caminho
+
+    # -----------------------------------------------------------------
+    # Capturas por janela de tempo
+    # -----------------------------------------------------------------
+    def capturar_cprofile(self, segundos=DURACAO_PADRAO):
+        """Inicia uma captura cProfile de `segundos` em segundo plano."""
+        if self._captura is not None:
+            print("[PERFIL] Captura cProfile já em andamento - ignorado.")
+            return False
+        captura = _CapturaCProfile()
+        if PERFIL_GLOBAL:
+            try:
+                captura.iniciar_global()
+            except ValueError as e:
+                print(f"[PERFIL] Não foi possível iniciar o cProfile: {e}")
+                return False
+        self._captura = captura
+        print(f"[PERFIL] Captura cProfile iniciada por {segundos}s")
+        threading.Thread(target=self._finalizar_cprofile, args=(segundos,), daemon=True).start()
+        return True
+
+    def _finalizar_cprofile(self, segundos):
+        captura = self._captura
+        try:
+            time.sleep(segundos)
+        finally:
+            # Sempre desliga a captura, mesmo se a espera falhar
+            self._captura = None
+            captura.parar_global()
+        # Aguarda as threads saírem do bloco em andamento antes de consolidar.
+        with captura.cond:
+            captura.cond.wait_for(lambda: captura.ativos == 0, timeout=5.0)
+            perfis = list(captura.perfis)
+
+        if not perfis:
+            print("[PERFIL] Captura cProfile encerrada sem atividade no pipeline.")
+            return
+
+        stats = pstats.Stats(perfis[0])
+        for perfil in perfis[1:]:
+            stats.add(perfil)
+        caminho = self._caminho('cprofile', 'prof')
+        stats.dump_stats(caminho)
+        print(f"[PERFIL] Captura cProfile salva em {caminho} ({len(perfis)} thread(s))")
+
+    def capturar_tracemalloc(self, segundos=DURACAO_PADRAO, top=25):
+        """Tira dois snapshots separados por `segundos` e salva a diferença."""
+        if self._tracemalloc_ocupado:
+            print("[PERFIL] Captura tracemalloc já em andamento - ignorado.")
+            return False
+        self._tracemalloc_ocupado = True
+        print(f"[PERFIL] Captura tracemalloc iniciada por {segundos}s")
+        threading.Thread(target=self._executar_tracemalloc, args=(segundos, top), daemon=True).start()
+        return True
+
+    def _executar_tracemalloc(self, segundos, top):
+        ja_ativo = tracemalloc.is_tracing()
+        try:
+            if not ja_ativo:
+                tracemalloc.start(10)
+            antes = tracemalloc.take_snapshot()
+            time.sleep(segundos)
+            depois = tracemalloc.take_snapshot()
+        finally:
+            if not ja_ativo:
+                tracemalloc.stop()
+            self._tracemalloc_ocupado = False
+
+        base = self._caminho('tracemalloc', '')
+        antes.dump(base + 'antes.tracemalloc')
+        depois.dump(base + 'depois.tracemalloc')
+        diferencas = depois.compare_to(antes, 'lineno')
+        with open(base + 'diff.txt', 'w', encoding='utf-8') as f:
+            f.write(f"Diferença tracemalloc em {segundos}s (top {top})\n")
+            for estat in diferencas[:top]:
+                f.write(f"{estat}\n")
+        print(f"[PERFIL] Snapshots tracemalloc salvos em {base}*.tracemalloc / {base}diff.txt")
+
+    def _caminho(self, tipo, extensao):
+        os.makedirs(self.diretorio, exist_ok=True)
+        carimbo = time.strftime('%Y%m%d-%H%M%S')
+        nome = f"{tipo}-{os.getpid()}-{carimbo}"
+        return os.path.join(self.diretorio, f"{nome}.{extensao}" if extensao else f"{nome}.")
+
+    # -----------------------------------------------------------------
+    # Acionadores: sinais e socket de controle
+    # -----------------------------------------------------------------
+    def instalar_sinais(self):
+        """Registra SIGUSR1/SIGUSR2 (deve ser chamado na thread principal)."""
+        if not hasattr(signal, 'SIGUSR1'):
+            return False
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.capturar_cprofile())
+        signal.signal(signal.SIGUSR2, lambda signum, frame: self.capturar_tracemalloc())
+        print(f"[PERFIL] Sinais: SIGUSR1 → cProfile, SIGUSR2 → tracemalloc (pid {os.getpid()})")
+        return True
+
+    def iniciar_controle(self):
+        """Abre o socket de controle local, se uma porta foi configurada."""
+        if self.porta_controle is None:
+            return False
+        self._sock_controle = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock_controle.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock_controle.bind((self.host_controle, self.porta_controle))
+        self._sock_controle.listen(5)
+        threading.Thread(target=self._loop_controle, daemon=True).start()
+        print(f"[PERFIL] Controle de perfilamento em {self.host_controle}:{self.porta_controle}")
+        return True
+
+    def _loop_controle(self):
+        while True:
+            try:
+                conn, _ = self._sock_controle.accept()
+            except OSError:
+                return
+            # Uma thread por conexão: um controlador ocioso não bloqueia os demais
+            threading.Thread(target=self._atender_controle, args=(conn,), daemon=True).start()
+
+    def _atender_controle(self, conn):
+        try:
+            with conn:
+                conn.settimeout(TIMEOUT_CONTROLE)
+                for linha in conn.makefile('r', encoding='utf-8'):
+                    resposta = self.executar_comando(linha)
+                    conn.sendall((resposta + "\n").encode('utf-8'))
+        except (OSError, UnicodeDecodeError):
+            # Cliente fechou antes da resposta, ficou ocioso ou mandou bytes inválidos
+            pass
+
+    def executar_comando(self, linha):
+        """Interpreta um comando de controle e devolve a resposta em texto."""
+        partes = linha.split()
+        if not partes:
+            return 'erro: comando vazio'
+        comando, args = partes[0].lower(), partes[1:]
+        try:
+            segundos = float(args[0]) if args and comando in ('cprofile', 'tracemalloc') else DURACAO_PADRAO
+        except ValueError:
+            return f"erro: duração inválida '{args[0]}'"
+        if not (math.isfinite(segundos) and segundos > 0):
+            return f"erro: duração inválida '{args[0]}'"
+
+        if comando == 'cprofile':
+            return 'ok' if self.capturar_cprofile(segundos) else 'erro: captura em andamento'
+        if comando == 'tracemalloc':
+            return 'ok' if self.capturar_tracemalloc(segundos) else 'erro: captura em andamento'
+        if comando == 'timers':
+            acao = args[0].lower() if args else 'dump'
+            if acao == 'on':
+                self.ligar_timers()
+                return 'ok'
+            if acao == 'off':
+                self.desligar_timers()
+                return 'ok'
+            if acao == 'reset':
+                self.resetar_timers()
+                return 'ok'
+            if acao == 'dump':
+                return f"ok {self.salvar_timers()}"
+            return f"erro: ação de timers desconhecida '{acao}'"
+        if comando == 'status':
+            return json.dumps({
+                'timers_ativos': self.timers_ativos,
+                'cprofile_ativo': self._captura is not None,
+                'tracemalloc_ativo': self._tracemalloc_ocupado,
+                'timers': self.resumo_timers(),
+            }, ensure_ascii=False)
+        return f"erro: comando desconhecido '{comando}'"
+
+    def parar(self):
+        if self._sock_controle is not None:
+            self._sock_controle.close()
+            self._sock_controle = None
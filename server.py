@@ -1,12 +1,18 @@
 import socket
 import json
 import hashlib
+import hmac
+import os
 import time
 import argparse
 import threading
 import ssl
 from cryptography.fernet import Fernet 
 import base64
+from profiler import Profiler
+from pipeline_cripto import PipelineCripto, MODOS as MODOS_PIPELINE
+from transmissao import CanalEnvio
+from estado import SessaoServidor
 
 # =================================================================
 # VARIÁVEIS DE SEGURANÇA E INTEGRIDADE
@@ -18,10 +24,13 @@ def calcular_checksum(texto):
     """Calcula um hash SHA-1 do texto para verificação de integridade."""
     return hashlib.sha1(texto.encode('utf-8')).hexdigest()
 
+# Validade dos tickets de sessão usados no 0-RTT (segundos)
+TICKET_VALIDADE = 300
+
 # =================================================================
 
 class Server:
-    def __init__(self, host='127.0.0.1', port=5005, protocol='gbn', max_chars=30, max_payload=4, window_size=5, use_ssl=False):
+    def __init__(self, host='127.0.0.1', port=5005, protocol='gbn', max_chars=30, max_payload=4, window_size=5, use_ssl=False, profiler=None, pipeline=None, nodelay=True, cork=False):
         self.host = host
         self.port = port
         self.protocol = protocol
@@ -29,12 +38,72 @@ class Server:
         self.max_payload = max_payload       
         self.window_size = window_size  # Tamanho da janela padrão do servidor
         self.use_ssl = use_ssl
+        # Controle explícito do TCP nas conexões aceitas (ver transmissao.py)
+        self.nodelay = nodelay
+        self.cork = cork
         self.client_sessions = {}
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.fernet = Fernet(CHAVE_SIMETRICA_FERNET)
+        # Perfilamento sob demanda (desligado por padrão; custo mínimo no caminho crítico)
+        self.profiler = profiler if profiler is not None else Profiler()
+        # Pipeline opcional de descriptografia/checksum em lote (None = inline na thread de conexão)
+        self.pipeline = pipeline
+        # [0-RTT] Chave HMAC dos tickets de sessão (renovada a cada execução) e nonces já usados
+        self.chave_ticket = os.urandom(32)
+        self.tickets_usados = {}
+        self.tickets_lock = threading.Lock()
+
+    def enviar(self, canal, mensagem):
+        """Serializa e enfileira uma mensagem de controle (SYN-ACK, ACK, NACK) no canal da conexão.
+
+        Os quadros enfileirados são enviados juntos ao fim do bloco recebido (ver client_thread).
+        """
+        with self.profiler.fase('json'):
+            canal.enfileirar((json.dumps(mensagem) + "\n").encode('utf-8'))
+
+    def emitir_ticket(self, protocol, window_size, max_payload):
+        """Gera um ticket assinado (HMAC-SHA256) com os parâmetros negociados, para o 0-RTT."""
+        parametros = {
+            'protocol': protocol,
+            'window_size': window_size,
+            'max_payload': max_payload,
+            'expira': time.time() + TICKET_VALIDADE,
+            'nonce': base64.urlsafe_b64encode(os.urandom(9)).decode(),
+        }
+        corpo = base64.urlsafe_b64encode(json.dumps(parametros).encode('utf-8')).decode()
+        assinatura = hmac.new(self.chave_ticket, corpo.encode(), hashlib.sha256).hexdigest()
+        return f"{corpo}.{assinatura}"
 
-    def handle_syn(self, client_socket, client_addr, data):
+    def validar_ticket(self, ticket, protocol, packet_size):
+        """Valida assinatura, validade, parâmetros e uso único do ticket. Retorna os parâmetros ou None."""
+        try:
+            corpo, assinatura = ticket.split('.', 1)
+            esperada = hmac.new(self.chave_ticket, corpo.encode(), hashlib.sha256).hexdigest()
+            # Compara bytes: compare_digest lança TypeError em str com caracteres não-ASCII
+            if not hmac.compare_digest(assinatura.encode('utf-8'), esperada.encode('utf-8')):
+                return None
+            parametros = json.loads(base64.urlsafe_b64decode(corpo.encode()))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+        agora = time.time()
+        if parametros['expira'] < agora:
+            return None
+        if parametros['protocol'] != protocol or parametros['max_payload'] != packet_size:
+            return None
+
+        # Anti-replay: cada ticket só pode abrir uma sessão 0-RTT
+        with self.tickets_lock:
+            for nonce, expira in list(self.tickets_usados.items()):
+                if expira < agora:
+                    del self.tickets_usados[nonce]
+            if parametros['nonce'] in self.tickets_usados:
+                return None
+            self.tickets_usados[parametros['nonce']] = parametros['expira']
+        return parametros
+
+    def handle_syn(self, canal, client_addr, data):
         session_id = hashlib.md5(f"{client_addr}{time.time()}".encode()).hexdigest()[:8]
         
         # [REQUISITO: Janela] Negociação do tamanho da janela - usa o MÍNIMO entre cliente e servidor
@@ -47,88 +116,118 @@ class Server:
             negotiated_payload = client_packet_size
         else:
             negotiated_payload = self.max_payload
+
+        # [0-RTT] SYN com ticket válido: reaproveita os parâmetros e aceita os dados antecipados
+        ticket = None
+        if 'ticket' in data:
+            ticket = self.validar_ticket(data['ticket'], data.get('protocol', self.protocol), negotiated_payload)
+            if ticket:
+                negotiated_window_size = min(self.window_size, ticket['window_size'])
+        early_data = data.get('early_data', []) if ticket else []
+        if not isinstance(early_data, list):
+            early_data = []
         
-        self.client_sessions[client_addr] = {
-            'session_id': session_id,
-            'handshake_complete': False,
-            'buffer': {},               # Buffer para GBN (em ordem)
-            'buffer_sr': {},            # Buffer para SR (fora de ordem)
-            'packets_received': 0,
-            'acks_sent': 0,
-            'messages_complete': 0,     # Contador de mensagens completas recebidas
-            'start_time': time.time(),
-            'protocol': data.get('protocol', self.protocol),
-            'corrupted': False,         # Estado de corrupção da mensagem atual (GBN)
-            'expected_seq_num': 0,      # Próxima sequência esperada (base da janela SR/GBN)
-            'total_packets_msg': 0,     # Total de pacotes esperados para a mensagem
-            'window_size': negotiated_window_size,  # Janela negociada
-            'max_payload': negotiated_payload
-        }
+        # Vetor de remontagem pré-alocado para o maior número de pacotes de uma mensagem
+        capacidade_msg = -(-self.max_chars // max(1, negotiated_payload))
+        self.client_sessions[client_addr] = SessaoServidor(
+            session_id,
+            data.get('protocol', self.protocol),
+            negotiated_window_size,
+            negotiated_payload,
+            capacidade_msg,
+            handshake_complete=ticket is not None,
+        )
         
         syn_ack = {
             'status': 'ok', 
-            'protocol': self.client_sessions[client_addr]['protocol'],
+            'protocol': self.client_sessions[client_addr].protocol,
             'max_chars': self.max_chars, 
             'max_payload': negotiated_payload,
             'window_size': negotiated_window_size,  # Envia o valor negociado
-            'session_id': session_id
+            'session_id': session_id,
+            'ticket': self.emitir_ticket(self.client_sessions[client_addr].protocol, negotiated_window_size, negotiated_payload),
         }
-        client_socket.sendall((json.dumps(syn_ack) + "\n").encode('utf-8'))
+        if 'ticket' in data:
+            syn_ack['early_data_accepted'] = ticket is not None
+        self.enviar(canal, syn_ack)
         print(f"[SERVIDOR] SYN-ACK enviado para {client_addr}")
         print(f"           Session: {session_id}")
-        print(f"           Protocolo: {self.client_sessions[client_addr]['protocol']}")
+        print(f"           Protocolo: {self.client_sessions[client_addr].protocol}")
         print(f"           Janela negociada: {negotiated_window_size} (Cliente: {client_window_size}, Servidor: {self.window_size})")
         print(f"           Payload negociado: {negotiated_payload}")
+
+        if 'ticket' in data:
+            if ticket is None:
+                print(f"[SERVIDOR] ✗ Ticket 0-RTT inválido/expirado/reutilizado - dados antecipados descartados.")
+            else:
+                print(f"[SERVIDOR] ✓ Handshake 0-RTT concluído para {client_addr} ({len(early_data)} pacote(s) antecipado(s))\n")
+                # Dados antecipados só são processados depois do SYN-ACK (ACKs chegam na ordem certa)
+                for message_data in early_data[:negotiated_window_size]:
+                    if isinstance(message_data, dict) and message_data.get('type') == 'data':
+                        self.handle_data_message(canal, client_addr, message_data)
         return session_id
 
     def handle_ack(self, client_addr, data):
         if client_addr in self.client_sessions:
-            self.client_sessions[client_addr]['handshake_complete'] = True
+            self.client_sessions[client_addr].handshake_complete = True
             print(f"[SERVIDOR] ✓ Handshake concluído para {client_addr}\n")
 
-    def handle_data_message(self, client_socket, client_addr, message_data):
+    def decifrar_e_verificar(self, data_encriptada_str):
+        """Descriptografa (Fernet) e calcula o checksum inline. Retorna (data, checksum, erro)."""
+        erro = None
+        try:
+            with self.profiler.fase('decrypt'):
+                data_encriptada_bytes = data_encriptada_str.encode('utf-8')
+                data_desencriptada_bytes = self.fernet.decrypt(data_encriptada_bytes)
+                data_desencriptada = data_desencriptada_bytes.decode('utf-8')
+        except Exception as e:
+            erro = str(e) or type(e).__name__
+            data_desencriptada = ""
+
+        with self.profiler.fase('checksum'):
+            checksum_calculado = calcular_checksum(data_desencriptada)
+        return data_desencriptada, checksum_calculado, erro
+
+    def handle_data_message(self, canal, client_addr, message_data, verificado=None):
+        """Processa um pacote de dados. `verificado` traz (data, checksum, erro) já calculados pelo pipeline."""
         session = self.client_sessions.get(client_addr)
         if not session: return False
         
-        protocol = session.get('protocol', 'gbn')
+        protocol = session.protocol
         sequence = message_data.get('sequence', 0)
         total_packets = message_data.get('total_packets', 0)
         data_encriptada_str = message_data.get('data', '')
         checksum_recebido = message_data.get('checksum')
         is_last_packet = message_data.get('is_last', False)
-        window_size = session['window_size']
+        window_size = session.window_size
         
         # Resetar o estado da mensagem no início de uma nova mensagem/retransmissão
-        if sequence == session['expected_seq_num'] and protocol == 'sr' and not session['buffer_sr']:
-             session['corrupted'] = False
-             session['total_packets_msg'] = total_packets
+        if sequence == session.expected_seq_num and protocol == 'sr' and session.buffer_vazio():
+             session.corrupted = False
+             session.total_packets_msg = total_packets
+             session.msg_base_seq = sequence
              print(f"[SERVIDOR] → Status e Total de Pacotes (SR) resetados para nova rajada.")
-        elif sequence == session['expected_seq_num'] and protocol == 'gbn' and not session['buffer']:
-             session['corrupted'] = False
-             session['total_packets_msg'] = total_packets
+        elif sequence == session.expected_seq_num and protocol == 'gbn' and session.buffer_vazio():
+             session.corrupted = False
+             session.total_packets_msg = total_packets
+             session.msg_base_seq = sequence
              print(f"[SERVIDOR] → Status e Total de Pacotes (GBN) resetados para nova rajada.")
 
-        data_desencriptada = None
-        
-        # 1. Descriptografia Simétrica (Fernet)
-        try:
-            data_encriptada_bytes = data_encriptada_str.encode('utf-8')
-            data_desencriptada_bytes = self.fernet.decrypt(data_encriptada_bytes)
-            data_desencriptada = data_desencriptada_bytes.decode('utf-8')
-        except Exception as e:
-            print(f"[SERVIDOR] ERRO FATAL: Falha ao descriptografar dado de {client_addr}. {e}")
-            data_desencriptada = ""
-
-        # 2. Checagem de Integridade (Checksum SHA-1)
-        checksum_calculado = calcular_checksum(data_desencriptada)
+        # 1. Descriptografia Simétrica (Fernet) e 2. Checagem de Integridade (Checksum SHA-1)
+        if verificado is None:
+            verificado = self.decifrar_e_verificar(data_encriptada_str)
+        data_desencriptada, checksum_calculado, erro = verificado
+        if erro:
+            print(f"[SERVIDOR] ERRO FATAL: Falha ao descriptografar dado de {client_addr}. {erro}")
         data = data_desencriptada
 
-        print(f"[SERVIDOR] Pacote #{sequence} ({protocol}) recebido de {client_addr}")
-        print(f"           Conteúdo Desencriptado: '{data}' | Tamanho: {len(data)}")
-        print(f"           Checksum enviado: {checksum_recebido[:16]}... | Checksum calculado: {checksum_calculado[:16]}...")
+        with self.profiler.fase('print'):
+            print(f"[SERVIDOR] Pacote #{sequence} ({protocol}) recebido de {client_addr}")
+            print(f"           Conteúdo Desencriptado: '{data}' | Tamanho: {len(data)}")
+            print(f"           Checksum enviado: {checksum_recebido[:16]}... | Checksum calculado: {checksum_calculado[:16]}...")
         
         # Validação de Checksum/Integridade e Tamanho de Carga Útil
-        max_payload = session.get('max_payload', self.max_payload)
+        max_payload = session.max_payload
         is_corrupt_packet = (checksum_recebido != checksum_calculado) or (len(data) > max_payload)
 
         # 3. Processamento de Pacote
@@ -139,12 +238,12 @@ class Server:
             if protocol == 'sr': 
                 # NACK seletivo para o pacote corrupto
                 nack = {'type':'ack','status':'error','sequence':sequence, 'message': nack_msg, 'timestamp':time.time()}
-                client_socket.sendall((json.dumps(nack) + "\n").encode('utf-8'))
-                session['acks_sent'] += 1
+                self.enviar(canal, nack)
+                session.acks_sent += 1
                 print(f"[SERVIDOR] ✗ Pacote #{sequence} INVÁLIDO! → NACK (SR) enviado.\n")
             elif protocol == 'gbn': 
                 # No GBN, qualquer erro no pacote esperado invalida o lote e o servidor não avança expected_seq_num
-                session['corrupted'] = True
+                session.corrupted = True
                 print(f"[SERVIDOR] ✗ Pacote #{sequence} INVÁLIDO! (GBN) - Marcado para NACK final.\n")
 
             return False
@@ -153,41 +252,41 @@ class Server:
         else:
             if protocol == 'gbn':
                 # GBN: Só aceita pacotes em ordem
-                if sequence == session['expected_seq_num']:
-                    session['buffer'][sequence] = data
-                    session['packets_received'] += 1
-                    session['expected_seq_num'] += 1
+                if sequence == session.expected_seq_num:
+                    session.armazenar(sequence, data)
+                    session.packets_received += 1
+                    session.expected_seq_num += 1
                     print(f"[SERVIDOR] ✓ Pacote #{sequence} íntegro (GBN) → Aceito em ordem.\n")
                 else:
                     # Pacote fora de ordem (duplicado ou à frente) - Descartar silenciosamente
-                    session['corrupted'] = True # Força NACK final, pois algo deu errado.
+                    session.corrupted = True # Força NACK final, pois algo deu errado.
                     print(f"[SERVIDOR] ✗ Pacote #{sequence} íntegro, mas FORA DE ORDEM (GBN) → Descartado e marcado para NACK final.\n")
 
 
             elif protocol == 'sr':
                 # SR: Aceita pacotes dentro da janela
-                base = session['expected_seq_num']
+                base = session.expected_seq_num
                 
                 if base <= sequence < base + window_size:
                     # Pacote está dentro da janela (inclusive se for a base)
-                    if sequence not in session['buffer_sr']:
-                        session['buffer_sr'][sequence] = data
-                        session['packets_received'] += 1
+                    if not session.tem(sequence):
+                        session.armazenar(sequence, data)
+                        session.packets_received += 1
                         
                         ack = {'type': 'ack', 'status': 'ok', 'sequence': sequence, 'message': 'Pacote recebido com sucesso (SR)', 'timestamp': time.time()}
-                        client_socket.sendall((json.dumps(ack) + "\n").encode('utf-8'))
-                        session['acks_sent'] += 1
+                        self.enviar(canal, ack)
+                        session.acks_sent += 1
                         print(f"[SERVIDOR] ✓ Pacote #{sequence} íntegro (SR) → ACK SELETIVO enviado.\n")
 
                     # Tenta avançar a base da janela (coletando pacotes bufferizados)
-                    while session['expected_seq_num'] in session['buffer_sr']:
-                        session['expected_seq_num'] += 1
+                    while session.tem(session.expected_seq_num):
+                        session.expected_seq_num += 1
 
                 elif sequence < base:
                     # ACK para um pacote já recebido (duplicado)
                     ack = {'type': 'ack', 'status': 'ok', 'sequence': sequence, 'message': 'ACK duplicado enviado (SR)', 'timestamp': time.time()}
-                    client_socket.sendall((json.dumps(ack) + "\n").encode('utf-8'))
-                    session['acks_sent'] += 1
+                    self.enviar(canal, ack)
+                    session.acks_sent += 1
                     print(f"[SERVIDOR] ✓ Pacote #{sequence} DUPLICADO (SR) → ACK reenviado.\n")
                 else:
                     # Pacote muito à frente da janela (descartado)
@@ -197,18 +296,19 @@ class Server:
 
         # 4. Final da Mensagem
 
-        # Condição de término SR: A base da janela (expected_seq_num) alcança o total de pacotes da mensagem.
-        if session['expected_seq_num'] == session['total_packets_msg'] and protocol == 'sr' and session['total_packets_msg'] > 0:
+        # Condição de término SR: A base da janela (expected_seq_num) alcança o fim da mensagem.
+        # (as sequências continuam crescendo entre mensagens da mesma sessão)
+        if session.expected_seq_num == session.msg_base_seq + session.total_packets_msg and protocol == 'sr' and session.total_packets_msg > 0:
             
-            # Montar a mensagem completa a partir do buffer SR
-            full_message = ''.join(session['buffer_sr'][i] for i in sorted(session['buffer_sr']))
+            # Montar a mensagem completa a partir do vetor de remontagem (já em ordem)
+            full_message = session.remontar()
             
             print(f"\n{'='*70}")
             print(f"{'MENSAGEM COMPLETA RECEBIDA (SR)':^70}")
             print(f"{'='*70}")
             print(f"De: {client_addr}")
             print(f"Protocolo: SR (Selective Repeat)")
-            print(f"Total de pacotes: {session['total_packets_msg']}")
+            print(f"Total de pacotes: {session.total_packets_msg}")
             print(f"{'-'*70}")
             print(f"CONTEÚDO DA MENSAGEM:")
             print(f"{full_message}")
@@ -216,22 +316,22 @@ class Server:
             print(f"Tamanho: {len(full_message)} caracteres")
             print(f"{'='*70}\n")
             
-            session['messages_complete'] += 1
-            session['buffer_sr'].clear()
-            session['total_packets_msg'] = 0
+            session.messages_complete += 1
+            session.limpar_mensagem(session.expected_seq_num)
             
         # Condição de término GBN: O último pacote da rajada foi processado (e aceito em ordem)
         elif is_last_packet and protocol == 'gbn':
             
-            full_message = ''.join(session['buffer'][i] for i in sorted(session['buffer']))
-            is_message_corrupted = session.pop('corrupted', False)
+            full_message = session.remontar()
+            is_message_corrupted = session.corrupted
+            session.corrupted = False
 
             print(f"\n{'='*70}")
             print(f"{'MENSAGEM COMPLETA RECEBIDA (GBN)':^70}")
             print(f"{'='*70}")
             print(f"De: {client_addr}")
             print(f"Protocolo: GBN (Go-Back-N)")
-            print(f"Total de pacotes: {session['total_packets_msg']}")
+            print(f"Total de pacotes: {session.total_packets_msg}")
             print(f"{'-'*70}")
             
             if is_message_corrupted:
@@ -240,6 +340,8 @@ class Server:
                 print(f"STATUS: ✗ REJEITADA")
                 print(f"MOTIVO: {msg}")
                 print(f"{'='*70}\n")
+                # O cliente retransmite a mensagem inteira: volta a esperar pelo seu primeiro pacote
+                session.expected_seq_num = session.msg_base_seq
             else:
                 status = 'ok'
                 msg = 'Mensagem recebida com sucesso (GBN)'
@@ -249,14 +351,13 @@ class Server:
                 print(f"{'-'*70}")
                 print(f"Tamanho: {len(full_message)} caracteres")
                 print(f"{'='*70}\n")
-                session['messages_complete'] += 1
+                session.messages_complete += 1
             
             final_ack = {'type':'ack','status':status,'sequence':sequence, 'message': msg, 'echo': full_message, 'timestamp':time.time()}
-            client_socket.sendall((json.dumps(final_ack) + "\n").encode('utf-8'))
-            session['acks_sent'] += 1
+            self.enviar(canal, final_ack)
+            session.acks_sent += 1
 
-            session['buffer'].clear()
-            session['total_packets_msg'] = 0
+            session.limpar_mensagem(session.expected_seq_num)
 
         return True
 
@@ -264,24 +365,26 @@ class Server:
         """Remove a sessão do cliente e exibe estatísticas."""
         if client_addr in self.client_sessions:
             session = self.client_sessions.pop(client_addr)
-            duration = time.time() - session['start_time']
+            duration = time.time() - session.start_time
             
             print(f"\n{'='*60}")
-            print(f"ESTATÍSTICAS DA SESSÃO {session['session_id']}")
+            print(f"ESTATÍSTICAS DA SESSÃO {session.session_id}")
             print(f"{'='*60}")
             print(f"Cliente: {client_addr}")
-            print(f"Protocolo: {session['protocol']}")
-            print(f"Tamanho da janela: {session['window_size']}")
+            print(f"Protocolo: {session.protocol}")
+            print(f"Tamanho da janela: {session.window_size}")
             print(f"{'-'*60}")
-            print(f"Mensagens completas recebidas: {session['messages_complete']}")
-            print(f"Pacotes individuais recebidos: {session['packets_received']}")
-            print(f"ACKs/NACKs enviados: {session['acks_sent']}")
+            print(f"Mensagens completas recebidas: {session.messages_complete}")
+            print(f"Pacotes individuais recebidos: {session.packets_received}")
+            print(f"ACKs/NACKs enviados: {session.acks_sent}")
             print(f"Duração da conexão: {duration:.2f} segundos")
             print(f"{'='*60}\n")
 
     def client_thread(self, client_socket, addr):
         client_addr = f"{addr[0]}:{addr[1]}"
         buffer = ''
+        # ACKs/NACKs gerados por um bloco recebido saem juntos num único sendmsg
+        canal = CanalEnvio(client_socket, self.nodelay, self.cork)
         try:
             print(f"\n{'='*60}")
             print(f"[SERVIDOR] Nova conexão de {client_addr}")
@@ -293,28 +396,54 @@ class Server:
                     break
                 buffer += data.decode('utf-8')
 
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    if not line.strip():
-                        continue
-                    try:
-                        message_data = json.loads(line)
-                    except json.JSONDecodeError as e:
-                        print(f"[SERVIDOR] Erro ao decodificar JSON de {client_addr}: {e}")
-                        continue
-
-                    if 'protocol' in message_data and 'type' not in message_data: 
-                        self.handle_syn(client_socket, client_addr, message_data)
-                    elif 'session_id' in message_data and 'message' in message_data and message_data['message'] == 'Handshake completo': 
-                        self.handle_ack(client_addr, message_data)
-                    elif message_data.get('type') == 'data': 
-                        self.handle_data_message(client_socket, client_addr, message_data)
-                    elif message_data.get('type') == 'close':
-                        self.handle_close(client_addr, message_data)
-                        print(f"[SERVIDOR] Close recebido de {client_addr} — conexão encerrada.\n")
-                        return # Encerra a thread
-                    else:
-                        print(f"[SERVIDOR] Tipo de mensagem desconhecido: {message_data.get('type')}")
+                # Perfilamento cProfile sob demanda: só o processamento é medido, não o recv bloqueante.
+                with self.profiler.bloco():
+                    mensagens = []
+                    while '\n' in buffer:
+                        line, buffer = buffer.split('\n', 1)
+                        if not line.strip():
+                            continue
+                        try:
+                            with self.profiler.fase('json'):
+                                mensagens.append(json.loads(line))
+                        except json.JSONDecodeError as e:
+                            print(f"[SERVIDOR] Erro ao decodificar JSON de {client_addr}: {e}")
+
+                    # Pipeline em lote: submete todos os quadros de dados do bloco de uma vez
+                    # e consome os resultados na ordem de chegada (ordem por sessão preservada).
+                    verificados = {}
+                    if self.pipeline is not None and self.pipeline.ativo():
+                        indices = [i for i, m in enumerate(mensagens) if m.get('type') == 'data']
+                        if indices:
+                            futuro = self.pipeline.submeter([mensagens[i].get('data', '') for i in indices])
+                            with self.profiler.fase('pipeline'):
+                                try:
+                                    verificados = dict(zip(indices, futuro.result(self.pipeline.timeout)))
+                                except Exception as e:
+                                    # Pipeline quebrado ou travado: este bloco é verificado inline
+                                    # (handle_data_message chama decifrar_e_verificar)
+                                    print(f"[SERVIDOR] Falha no pipeline cripto ({type(e).__name__}: {e}) - verificação inline")
+                                    verificados = {}
+
+                    for i, message_data in enumerate(mensagens):
+                        if 'protocol' in message_data and 'type' not in message_data: 
+                            self.handle_syn(canal, client_addr, message_data)
+                        elif 'session_id' in message_data and 'message' in message_data and message_data['message'] == 'Handshake completo': 
+                            self.handle_ack(client_addr, message_data)
+                        elif message_data.get('type') == 'data': 
+                            with self.profiler.fase('handle_data_message'):
+                                self.handle_data_message(canal, client_addr, message_data, verificados.get(i))
+                        elif message_data.get('type') == 'close':
+                            canal.descarregar()
+                            self.handle_close(client_addr, message_data)
+                            print(f"[SERVIDOR] Close recebido de {client_addr} — conexão encerrada.\n")
+                            return # Encerra a thread
+                        else:
+                            print(f"[SERVIDOR] Tipo de mensagem desconhecido: {message_data.get('type')}")
+
+                    # Todas as respostas do bloco numa única chamada de envio
+                    with self.profiler.fase('envio'):
+                        canal.descarregar()
 
         except Exception as e:
             print(f"[SERVIDOR] Erro na thread do cliente {client_addr}: {e}")
@@ -327,6 +456,8 @@ class Server:
     def start(self):
         self.sock.bind((self.host, self.port))
         self.sock.listen(5)
+        self.profiler.instalar_sinais()
+        self.profiler.iniciar_controle()
         
         print(f"\n{'='*60}")
         print("[SERVIDOR] Servidor iniciado")
@@ -365,6 +496,9 @@ class Server:
                 print(f"[SERVIDOR] Erro: {e}")
 
         self.sock.close()
+        self.profiler.parar()
+        if self.pipeline is not None:
+            self.pipeline.encerrar()
         print("[SERVIDOR] Socket fechado")
 
 
@@ -377,6 +511,15 @@ if __name__ == "__main__":
     parser.add_argument("--max_payload", type=int, default=4)
     parser.add_argument("--window_size", type=int, default=5, help="Tamanho máximo da janela (1-5)")
     parser.add_argument("--ssl", action='store_true', help="Ativar SSL/TLS (requer certificados server.crt e server.key)")
+    parser.add_argument("--profile_port", type=int, default=None, help="Porta local (127.0.0.1) do controle de perfilamento")
+    parser.add_argument("--profile_dir", default="perfis", help="Diretório onde os perfis são gravados")
+    parser.add_argument("--profile_timers", action='store_true', help="Ativar temporizadores por fase desde o início")
+    parser.add_argument("--no_nodelay", action='store_true', help="Desligar TCP_NODELAY nas conexões (volta ao algoritmo de Nagle)")
+    parser.add_argument("--cork", action='store_true', help="TCP_CORK durante cada envio agrupado (Linux)")
+    parser.add_argument("--crypto_pool", choices=('off',) + MODOS_PIPELINE, default='off', help="Descriptografia/checksum em lote num pool de processos ou threads")
+    parser.add_argument("--crypto_workers", type=int, default=None, help="Número de workers do pool (padrão: núcleos da CPU)")
+    parser.add_argument("--crypto_batch", type=int, default=32, help="Tamanho máximo do lote")
+    parser.add_argument("--crypto_latency_ms", type=float, default=2.0, help="Espera máxima para completar um lote (ms)")
     args = parser.parse_args()
 
     use_ssl = args.ssl  # SSL desabilitado por padrão, use --ssl para ativar
@@ -384,5 +527,16 @@ if __name__ == "__main__":
     # Garantir que window_size esteja entre 1 e 5
     window_size = max(1, min(5, args.window_size))
     
-    server = Server(args.host, args.port, args.protocol, args.max_chars, args.max_payload, window_size, use_ssl)
+    profiler = Profiler(args.profile_dir, args.profile_port)
+    if args.profile_timers:
+        profiler.ligar_timers()
+    
+    pipeline = None
+    if args.crypto_pool != 'off':
+        pipeline = PipelineCripto(CHAVE_SIMETRICA_FERNET, args.crypto_pool, args.crypto_workers,
+                                  args.crypto_batch, args.crypto_latency_ms / 1000.0)
+        print(f"[SERVIDOR] Pipeline cripto: {args.crypto_pool} ({pipeline.workers} workers, lote {pipeline.tamanho_lote}, {args.crypto_latency_ms} ms)")
+    
+    server = Server(args.host, args.port, args.protocol, args.max_chars, args.max_payload, window_size, use_ssl, profiler, pipeline,
+                    not args.no_nodelay, args.cork)
     server.start()
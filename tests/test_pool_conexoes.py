@@ -0,0 +1,86 @@
+import io
+import os
+import sys
+import time
+import socket
+import unittest
+import subprocess
+import contextlib
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from pool_conexoes import PoolConexoes
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class TestPoolConexoes(unittest.TestCase):
+    """Sobe o servidor real (server.py) num subprocesso e usa o pool contra ele."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.porta = porta_livre()
+        cls.servidor = subprocess.Popen(
+            [sys.executable, 'server.py', '--port', str(cls.porta)],
+            cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        prazo = time.monotonic() + 10
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', cls.porta), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > prazo:
+                    cls.servidor.kill()
+                    raise
+                time.sleep(0.1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.kill()
+        cls.servidor.wait()
+
+    def setUp(self):
+        self.pool = PoolConexoes(tamanho_max=2, intervalo_limpeza=0)
+        self.saida = contextlib.redirect_stdout(io.StringIO())
+        self.saida.__enter__()
+
+    def tearDown(self):
+        self.pool.fechar()
+        self.saida.__exit__(None, None, None)
+
+    def test_reutiliza_sessao_confirmada(self):
+        self.assertTrue(self.pool.enviar('127.0.0.1', self.porta, "primeira", 'gbn', 4))
+        self.assertTrue(self.pool.enviar('127.0.0.1', self.porta, "segunda", 'gbn', 4))
+        estat = self.pool.estatisticas()
+        self.assertEqual(estat['criadas'], 1)
+        self.assertEqual(estat['reutilizadas'], 1)
+
+    def test_conexao_descarta_sessao_com_mensagem_nao_confirmada(self):
+        # Regressão: via conexao(), uma sessão cuja mensagem não foi confirmada voltava ao
+        # pool com a base de sequência adiantada em relação ao servidor, e as mensagens
+        # seguintes nessa sessão falhavam.
+        with self.pool.conexao('127.0.0.1', self.porta, 'gbn', 4) as cliente:
+            # Perde o pacote 0 e não retransmite: a mensagem não é confirmada
+            cliente.MAX_RETRIES = 1
+            cliente.corrupt_message_seq = cliente.messages_sent
+            cliente.corrupt_packet_index = 0
+            cliente.packet_loss_mode = True
+            self.assertFalse(cliente.enviar_mensagem("mensagem perdida"))
+            self.assertTrue(cliente.dessincronizado)
+
+        self.assertEqual(self.pool.estatisticas()['descartadas'], 1)
+        for i in range(3):
+            with self.pool.conexao('127.0.0.1', self.porta, 'gbn', 4) as cliente:
+                self.assertFalse(cliente.dessincronizado)
+                self.assertTrue(cliente.enviar_mensagem(f"depois {i}"))
+        self.assertEqual(self.pool.estatisticas()['descartadas'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import ssl
+import socket
+
+# =================================================================
+# CAMADA DE ENVIO AGRUPADO (SCATTER/GATHER)
+# =================================================================
+# Em vez de um sendall por pacote/ACK, os quadros prontos (a janela
+# atual no cliente, os ACKs pendentes no servidor) são enfileirados e
+# descarregados com UMA chamada socket.sendmsg. Sockets SSL não têm
+# sendmsg: nesse caso os quadros são concatenados num único sendall.
+#
+# Controle explícito de TCP_NODELAY (desliga o Nagle, evitando esperas
+# do ACK atrasado) e de TCP_CORK (Linux: segura segmentos parciais até
+# o fim do descarregamento).
+# =================================================================
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+def definir_nodelay(sock, ativo=True):
+    """Liga/desliga TCP_NODELAY. Retorna False se a opção não for suportada."""
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 if ativo else 0)
+        return True
+    except (OSError, AttributeError):
+        return False
+
+
+def definir_cork(sock, ativo=True):
+    """Liga/desliga TCP_CORK (somente Linux). Retorna False se não for suportado."""
+    if not hasattr(socket, 'TCP_CORK'):
+        return False
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1 if ativo else 0)
+        return True
+    except OSError:
+        return False
+
+
+class CanalEnvio:
+    def __init__(self, sock, nodelay=True, cork=False):
+        self.sock = sock
+        self.cork = cork and hasattr(socket, 'TCP_CORK')
+        self._quadros = []
+        # sendmsg só existe em sockets "crus" (SSLSocket lança NotImplementedError)
+        self.vetorizado = hasattr(sock, 'sendmsg') and not isinstance(sock, ssl.SSLSocket)
+        self.nodelay = definir_nodelay(sock, nodelay) and nodelay
+        # Estatísticas
+        self.syscalls = 0
+        self.descargas = 0
+        self.quadros_enviados = 0
+        self.bytes_enviados = 0
+
+    def enfileirar(self, dados):
+        """Adiciona um quadro (bytes) à fila do próximo descarregamento."""
+        self._quadros.append(dados)
+
+    def enviar(self, dados):
+        """Envia um quadro imediatamente (junto com o que estiver na fila)."""
+        self._quadros.append(dados)
+        self.descarregar()
+
+    def pendentes(self):
+        return len(self._quadros)
+
+    def descarregar(self):
+        """Envia todos os quadros enfileirados. Retorna quantos quadros foram enviados."""
+        quadros = self._quadros
+        if not quadros:
+            return 0
+        self._quadros = []
+
+        if self.cork:
+            definir_cork(self.sock, True)
+        try:
+            if self.vetorizado:
+                total = self._sendmsg_completo(quadros)
+            else:
+                dados = b''.join(quadros)
+                self.sock.sendall(dados)
+                self.syscalls += 1
+                total = len(dados)
+        finally:
+            if self.cork:
+                definir_cork(self.sock, False)
+
+        self.descargas += 1
+        self.quadros_enviados += len(quadros)
+        self.bytes_enviados += total
+        return len(quadros)
+
+    def _sendmsg_completo(self, quadros):
+        """Chama sendmsg até enviar todos os buffers (trata envios parciais e IOV_MAX)."""
+        buffers = [memoryview(q) for q in quadros]
+        total = 0
+        inicio = 0
+        while inicio < len(buffers):
+            enviados = self.sock.sendmsg(buffers[inicio:inicio + IOV_MAX])
+            self.syscalls += 1
+            total += enviados
+            # Descarta os buffers completos e recorta o parcialmente enviado
+            while inicio < len(buffers) and enviados >= len(buffers[inicio]):
+                enviados -= len(buffers[inicio])
+                inicio += 1
+            if enviados:
+                buffers[inicio] = buffers[inicio][enviados:]
+        return total